@@ -1,19 +1,29 @@
 import streamlit as st
-import pandas as pd
 import requests
 import html
-from bs4 import BeautifulSoup
+import html.parser
+import asyncio
+import base64
+import bisect
+import collections
+import contextlib
+import email.utils
+import functools
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import zlib
 from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import google.generativeai as genai
-from fake_useragent import UserAgent, FakeUserAgentError
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait as wait_futures
 import time
 
-# Streamlit Configuration
-st.set_page_config(page_title="WhatsApp Content Generator", layout="wide", initial_sidebar_state="expanded")
-
 # Custom CSS for Improved UI
-st.markdown("""
+PAGE_CSS = """
 <style>
 body { font-family: 'Segoe UI', sans-serif; background-color: #f0f2f6; }
 .main-title { font-size: 2.5em; color: #25D366; text-align: center; margin-bottom: 0; font-weight: 700; }
@@ -41,34 +51,128 @@ body { font-family: 'Segoe UI', sans-serif; background-color: #f0f2f6; }
     .join-button { padding: 5px 10px; font-size: 0.8em; }
 }
 </style>
-""", unsafe_allow_html=True)
+"""
 
 # Constants
 WHATSAPP_DOMAIN = "https://chat.whatsapp.com/"
-MAX_WORKERS = 8
+INVITE_HOST = "chat.whatsapp.com"
+EXPIRED_STATUS = "Expired or Invalid Link"
+DEADLINE_STATUS = "Network Error: Deadline exceeded"
+LOCAL_FAILURE_PREFIXES = ("Network Error: Circuit open", "Network Error: Backing off", DEADLINE_STATUS) # Statuses we make up ourselves
+INVITE_PATH_RE = re.compile(r"^/+(?:invite/+)?([A-Za-z0-9]+)/*$") # Codes are case-sensitive; only the host is not
+INVITE_HOST_RE = re.compile(re.escape(INVITE_HOST), re.IGNORECASE) # Page pre-filter, for decoded text
+INVITE_HOST_BYTES_RE = re.compile(re.escape(INVITE_HOST).encode(), re.IGNORECASE) # Same, for raw bodies
+GEMINI_MODEL_NAME = "gemini-1.5-flash-latest"
+GEMINI_INPUT_PRICE_PER_MTOK = 0.075 # USD per million tokens, list price for GEMINI_MODEL_NAME
+GEMINI_OUTPUT_PRICE_PER_MTOK = 0.30
+VALIDATION_CONCURRENCY = 24 # Total in-flight validation requests
+REFRESH_CONCURRENCY = 32 # Validation workers in refresh mode; the host scheduler still caps the invite host
+PER_HOST_CONCURRENCY = 12 # Starting in-flight limit per host; the scheduler adapts it from there
+HOST_MIN_CONCURRENCY = 1
+HOST_MAX_CONCURRENCY = 32
+HOST_SLOW_FACTOR = 3 # Smoothed latency this many times the host's best counts as congestion
+CIRCUIT_FAILURE_THRESHOLD = 5 # Failures in a row that open a host's circuit
+CIRCUIT_COOLDOWN = 30 # Seconds before the first probe of an open circuit; doubles on each reopen
+CIRCUIT_MAX_COOLDOWN = 300
+MAX_HOST_WAIT = 30 # Longest Retry-After pause a request waits out before failing fast
+MIN_REQUEST_TIMEOUT = 5 # Floor for latency-derived timeouts
+VALIDATE_TIMEOUT = 20 # Default (and ceiling) timeouts per kind of request
+PAGE_FETCH_TIMEOUT = 15
+LOGO_FETCH_TIMEOUT = 15
+VALIDATION_DEADLINE = 120 # Seconds for a whole validation batch
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+VALIDATION_CACHE_PATH = os.path.join(CACHE_DIR, "link_validation.sqlite3")
+ACTIVE_CACHE_TTL = 24 * 3600 # Active groups get renamed or revoked, recheck daily
+EXPIRED_CACHE_TTL = 7 * 24 * 3600 # Dead links rarely come back
+ERROR_CACHE_TTL = 10 * 60 # Network errors are usually transient
+DESCRIPTION_CACHE_PATH = os.path.join(CACHE_DIR, "group_descriptions.sqlite3")
+DESCRIPTION_BATCH_SIZE = 25 # Group names packed into one description prompt
+DESCRIPTION_WORKERS = 4 # Concurrent LLM calls while describing groups
+LOGO_CACHE_DIR = os.path.join(CACHE_DIR, "logos")
+LOGO_CACHE_MAX_BYTES = 20 * 1024 * 1024
+LOGO_CACHE_LOW_WATER = 0.9 # Eviction frees this much headroom, so the next puts don't scan again
+LOGO_INDEX_MEMO_SIZE = 20000 # Index rows kept in memory
+LOGO_TTL = 7 * 24 * 3600
+LOGO_THUMB_SIZE = 40 # Matches the .group-logo-img display size
+LOGO_THUMB_FORMAT = "WEBP"
+LOGO_MIME_TYPES = {"webp": "image/webp", "png": "image/png", "jpeg": "image/jpeg", "gif": "image/gif"} # Formats kept inline
+LOGO_MAX_DOWNLOAD_BYTES = 5 * 1024 * 1024
+LOGO_MAX_INLINE_BYTES = 32 * 1024 # Larger "thumbnails" (e.g. Pillow missing) fall back to the remote URL
+LOGO_WORKERS = 8
+LOGO_WAIT_TIMEOUT = 10 # Seconds step 1 waits for logo fetches after validation finishes
+PAGE_CACHE_PATH = os.path.join(CACHE_DIR, "result_pages.sqlite3")
+PAGE_CACHE_MAX_BYTES = 50 * 1024 * 1024 # Compressed bodies kept for conditional re-fetches
+PAGE_LINKS_VERSION = 3 # Bump when link extraction changes so cached link sets are re-derived from stored bodies
+LAST_GROUPS_PATH = os.path.join(CACHE_DIR, "last_groups.json")
+TABLE_PAGE_SIZE = 50 # Rows per page in the step-2 groups table
+TABLE_ROW_CACHE_SIZE = 4096
+LIVE_TABLE_REFRESH = 0.5 # Minimum seconds between live table redraws during step 1
+ARTICLE_PROMPT_TOKEN_BUDGET = 6000 # Estimated tokens per article prompt; groups beyond it are left out of the prompt, not the table
+CHARS_PER_TOKEN = 4 # Rough estimate for English text; good enough for budgeting, not for billing
+ARTICLE_TABLE_MARKER = "[[GROUPS_TABLE]]"
+JOBS_PATH = os.path.join(CACHE_DIR, "jobs.sqlite3")
+JOB_WORKERS = 2 # Background jobs run at once; each job has its own inner concurrency
+JOB_POLL_INTERVAL = 1.0 # Seconds between progress polls in the UI and between idle worker checks
+JOB_REPORT_INTERVAL = 0.5 # Minimum seconds between progress writes from a running job
+JOB_HEARTBEAT = 10
+JOB_STALE_AFTER = 60 # A running job without a heartbeat this long lost its worker and is requeued
+JOB_MAX_ATTEMPTS = 3
+JOB_REUSE_TTL = 10 * 60 # An identical job finished this recently is reused instead of run again...
+JOB_REUSABLE_KINDS = ("scrape",) # ...but only for these kinds; LLM output and refreshes are always produced anew
+JOB_RETENTION = 7 * 24 * 3600
+WP_MAX_CONCURRENCY = 4 # Concurrent requests against the WordPress REST API
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60) # Histogram upper bounds in seconds
+METRICS_SAMPLE_SIZE = 2048 # Recent latencies kept per stage for percentiles
+HEAD_READ_LIMIT = 256 * 1024 # Give up on the fast meta path if </head> hasn't appeared by then
+KEEPALIVE_DRAIN_BYTES = 128 * 1024 # Body left unread (on the wire) that is still cheaper to drain than a new connection
 DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
 
-# Initialize Fake User Agent
-try:
-    ua = UserAgent()
-except FakeUserAgentError: # More specific error
-    st.warning("Failed to initialize fake-useragent due to network issues or outdated cache. Using default User-Agent.")
-    ua = None
-except Exception as e:
-    st.warning(f"Failed to initialize fake-useragent: {e}. Using default User-Agent.")
-    ua = None
+class LazyUserAgent:
+    """Random User-Agent strings from fake_useragent, which is only loaded on the first request.
 
-def get_headers():
-    user_agent_value = DEFAULT_USER_AGENT
-    if ua:
+    Building UserAgent() can refresh its data over the network, so it is kept off the
+    import and rerun path and done once per process. If it fails, `error` says why
+    and DEFAULT_USER_AGENT is used.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_agent = None
+        self._loaded = False
+        self.error = None
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                from fake_useragent import UserAgent
+                self._user_agent = UserAgent()
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+            self._loaded = True
+
+    def random(self):
+        if not self._loaded:
+            self._load()
+        if self._user_agent is None:
+            return DEFAULT_USER_AGENT
         try:
-            user_agent_value = ua.random
-        except Exception as e:
-            st.warning(f"Failed to get random User-Agent from fake_useragent: {e}. Using default.")
-            pass
+            return self._user_agent.random
+        except Exception:
+            return DEFAULT_USER_AGENT
+
+@st.cache_resource(show_spinner=False)
+def get_user_agents():
+    """Returns the process-wide LazyUserAgent."""
+    return LazyUserAgent()
+
+USER_AGENTS = get_user_agents()
+
+def get_headers():
     return {
-        "User-Agent": user_agent_value,
+        "User-Agent": USER_AGENTS.random(),
         "Accept-Language": "en-US,en;q=0.9"
     }
 
@@ -153,56 +257,1306 @@ Remember to replace placeholders like `[Current Year]` with the actual current y
 The provided groups table will be inserted into the content. Ensure the article flows naturally around it.
 """
 
+# --- Instrumentation ---
+
+class Metrics:
+    """Thread-safe counters for the pipeline stages, shared by every session in the process.
+
+    Each stage records its calls, a latency histogram, recent latencies for
+    percentiles, bytes fetched and errors by type. Caches record hits and misses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._stages = {}
+            self._caches = {}
+
+    def observe(self, stage, seconds, error=None, nbytes=0):
+        """Records one call of `stage`. `error` is an error type name, or None for success."""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = {
+                    "calls": 0, "seconds": 0.0, "max": 0.0, "bytes": 0, "errors": {},
+                    "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+                    "recent": collections.deque(maxlen=METRICS_SAMPLE_SIZE),
+                }
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["bytes"] += nbytes
+            stats["histogram"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats["recent"].append(seconds)
+            if error:
+                stats["errors"][error] = stats["errors"].get(error, 0) + 1
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        """Times the block as one call of `stage`.
+
+        The block may set probe["bytes"] and probe["error"] on the yielded dict. An
+        exception escaping the block is counted under its type name and re-raised.
+        """
+        probe = {"bytes": 0, "error": None}
+        started = time.perf_counter()
+        try:
+            yield probe
+        except Exception as e:
+            probe["error"] = type(e).__name__
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, probe["error"], probe["bytes"])
+
+    def count_cache(self, cache_name, hits=0, misses=0):
+        with self._lock:
+            counts = self._caches.setdefault(cache_name, {"hits": 0, "misses": 0})
+            counts["hits"] += hits
+            counts["misses"] += misses
+
+    @staticmethod
+    def _percentile(sorted_samples, fraction):
+        if not sorted_samples:
+            return None
+        return sorted_samples[min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))]
+
+    def snapshot(self):
+        """Returns all metrics as plain JSON-serialisable data. Latencies are in milliseconds."""
+        with self._lock:
+            stages = {}
+            bucket_labels = [f"<={bound * 1000:g}ms" for bound in LATENCY_BUCKETS] + ["slower"]
+            for stage, stats in sorted(self._stages.items()):
+                recent = sorted(stats["recent"])
+                error_count = sum(stats["errors"].values())
+                stages[stage] = {
+                    "calls": stats["calls"],
+                    "errors": error_count,
+                    "error_rate": round(error_count / stats["calls"], 4),
+                    "errors_by_type": dict(stats["errors"]),
+                    "mean_ms": round(stats["seconds"] / stats["calls"] * 1000, 1),
+                    "p50_ms": round(self._percentile(recent, 0.5) * 1000, 1),
+                    "p95_ms": round(self._percentile(recent, 0.95) * 1000, 1),
+                    "max_ms": round(stats["max"] * 1000, 1),
+                    "bytes": stats["bytes"],
+                    "histogram": dict(zip(bucket_labels, stats["histogram"])),
+                }
+            caches = {}
+            for cache_name, counts in sorted(self._caches.items()):
+                lookups = counts["hits"] + counts["misses"]
+                caches[cache_name] = {**counts, "hit_rate": round(counts["hits"] / lookups, 4) if lookups else None}
+            return {"started_at": self.started_at, "uptime_s": round(time.time() - self.started_at, 1), "stages": stages, "caches": caches}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+@st.cache_resource(show_spinner=False)
+def get_metrics():
+    """Returns the process-wide metrics, which outlive reruns and are shared with worker threads."""
+    return Metrics()
+
+METRICS = get_metrics()
+
+# --- Outbound Request Scheduler ---
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open or that asked us to back off."""
+
+def parse_retry_after(value):
+    """Returns the seconds a Retry-After header asks for (delta-seconds or an HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+class _HostState:
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.srtt = None # Smoothed latency and its mean deviation, as in TCP's RTO estimator
+        self.rttvar = 0.0
+        self.best_srtt = None
+        self.samples = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.circuit = "closed"
+        self.opens = 0
+        self.open_until = 0.0
+        self.resume_at = 0.0
+        self.last_error = None
+
+class HostSlot:
+    """One admitted request against a host. The caller reports how it went with observe() or observe_error()."""
+
+    def __init__(self, host, timeout):
+        self.host = host
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.outcome = None
+        self.error = None
+        self.retry_after = None
+
+    def observe(self, response):
+        if response.status_code == 429 or response.status_code >= 500:
+            self.outcome = "failure"
+            self.error = f"HTTP {response.status_code}"
+            self.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        else:
+            self.outcome = "success"
+
+    def observe_error(self, error):
+        self.outcome = "failure"
+        self.error = type(error).__name__
+
+def _resolve_waiter(future):
+    if not future.done():
+        future.set_result(None)
+
+class HostScheduler:
+    """Adaptive per-host admission control for outbound requests, shared by scraping and validation.
+
+    Each host's concurrency limit grows by about one per round of successful responses
+    and halves on a timeout, connection error, 429 or 5xx. When the host's smoothed
+    latency climbs past HOST_SLOW_FACTOR times its best, the limit shrinks gently
+    instead. Timeouts follow the host's latency (smoothed latency plus four mean
+    deviations), capped by the caller's default. After CIRCUIT_FAILURE_THRESHOLD
+    failures in a row the host's circuit opens: requests fail fast with
+    CircuitOpenError until a cooldown passes, then a single probe decides whether it
+    closes. A failed response with Retry-After pauses the host for that long instead
+    of counting toward the breaker.
+    """
+
+    def __init__(self, initial_limit=PER_HOST_CONCURRENCY, min_limit=HOST_MIN_CONCURRENCY, max_limit=HOST_MAX_CONCURRENCY):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self._cond = threading.Condition()
+        self._hosts = {}
+        self._waiters = {} # host -> deque of [loop, future] entries of acquire_async callers, oldest first
+
+    def reset(self):
+        with self._cond:
+            self._hosts = {}
+            self._cond.notify_all()
+            for host in list(self._waiters):
+                self._wake_next(host)
+
+    def _timeout(self, state, default_timeout):
+        if state.samples < 5:
+            return default_timeout
+        return min(default_timeout, max(MIN_REQUEST_TIMEOUT, state.srtt + 4 * state.rttvar))
+
+    def _admit(self, host, default_timeout, now):
+        """Takes a slot if the host has room. Returns (slot, None), or (None, seconds to wait or None for "until a release")."""
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.initial_limit)
+        if state.circuit == "open":
+            if now < state.open_until:
+                raise CircuitOpenError(f"Circuit open for {host} ({state.last_error}); retry in {state.open_until - now:.0f} s")
+            state.circuit = "half-open"
+        if now < state.resume_at:
+            return None, state.resume_at - now
+        capacity = 1 if state.circuit == "half-open" else int(state.limit)
+        if state.in_flight >= capacity:
+            return None, None
+        state.in_flight += 1
+        return HostSlot(host, self._timeout(state, default_timeout)), None
+
+    def acquire(self, host, default_timeout, max_wait=MAX_HOST_WAIT):
+        """Blocks until the host has room and returns a HostSlot.
+
+        Waiting for capacity is bounded by the caller's own deadline, but a Retry-After
+        pause longer than `max_wait` raises CircuitOpenError straight away.
+        """
+        with self._cond:
+            while True:
+                slot, wait = self._admit(host, default_timeout, time.monotonic())
+                if slot:
+                    return slot
+                if wait is not None and wait > max_wait:
+                    raise CircuitOpenError(f"Backing off {host} for {wait:.0f} s as it asked")
+                self._cond.wait(wait)
+
+    async def acquire_async(self, host, default_timeout, max_wait=MAX_HOST_WAIT):
+        """Like acquire, but waits on the event loop instead of blocking a thread.
+
+        Callers queue per host and are admitted first come, first served: only the
+        head of the queue tries for a slot, and release() wakes it from whichever
+        thread the request ran on.
+        """
+        loop = asyncio.get_running_loop()
+        entry = [loop, None]
+        with self._cond:
+            queue = self._waiters.setdefault(host, collections.deque())
+            queue.append(entry)
+        try:
+            while True:
+                with self._cond:
+                    self._drop_dead_waiters(queue)
+                    wait = None
+                    if queue[0] is entry:
+                        slot, wait = self._admit(host, default_timeout, time.monotonic())
+                        if slot:
+                            return slot
+                        if wait is not None and wait > max_wait:
+                            raise CircuitOpenError(f"Backing off {host} for {wait:.0f} s as it asked")
+                    entry[1] = loop.create_future()
+                try:
+                    await asyncio.wait_for(entry[1], wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                for i, queued in enumerate(queue):
+                    if queued is entry: # Already gone if its loop was closed under it
+                        del queue[i]
+                        break
+                if not queue:
+                    if self._waiters.get(host) is queue:
+                        del self._waiters[host]
+                else:
+                    # There may be room for the next caller too, or we were holding it up.
+                    self._wake_next(host)
+
+    @staticmethod
+    def _drop_dead_waiters(queue):
+        """Drops entries at the head whose event loop was closed without cancelling them."""
+        while queue and queue[0][0].is_closed():
+            queue.popleft()
+
+    def _wake_next(self, host):
+        """Wakes the oldest acquire_async caller for a host. Call with the lock held."""
+        queue = self._waiters.get(host)
+        if not queue:
+            return
+        self._drop_dead_waiters(queue)
+        if queue and queue[0][1] is not None:
+            loop, future = queue[0]
+            try:
+                loop.call_soon_threadsafe(_resolve_waiter, future)
+            except RuntimeError: # The loop closed since the check
+                pass
+
+    def release(self, slot):
+        """Returns the slot and adapts the host's limit, timeout and circuit to its outcome."""
+        now = time.monotonic()
+        with self._cond:
+            state = self._hosts.get(slot.host)
+            if state is None: # reset() while the request was in flight
+                return
+            state.in_flight -= 1
+            if slot.outcome == "success":
+                self._on_success(state, now - slot.started)
+            elif slot.outcome == "failure":
+                self._on_failure(state, slot, now)
+            self._cond.notify_all()
+            self._wake_next(slot.host)
+
+    def _on_success(self, state, latency):
+        state.successes += 1
+        state.consecutive_failures = 0
+        if state.circuit == "half-open":
+            state.circuit = "closed"
+            state.opens = 0
+        if state.srtt is None:
+            state.srtt, state.rttvar = latency, latency / 2
+        else:
+            state.rttvar += (abs(state.srtt - latency) - state.rttvar) / 4
+            state.srtt += (latency - state.srtt) / 8
+        state.samples += 1
+        state.best_srtt = state.srtt if state.best_srtt is None else min(state.best_srtt, state.srtt)
+        if state.samples >= 5 and state.srtt > HOST_SLOW_FACTOR * state.best_srtt:
+            state.limit = max(self.min_limit, state.limit * 0.9)
+        else:
+            state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+
+    def _on_failure(self, state, slot, now):
+        state.failures += 1
+        state.last_error = slot.error
+        state.limit = max(self.min_limit, state.limit / 2)
+        if slot.retry_after is not None:
+            # The host is up and told us how long to back off; pause instead of counting toward the breaker.
+            state.resume_at = max(state.resume_at, now + min(slot.retry_after, CIRCUIT_MAX_COOLDOWN))
+        else:
+            state.consecutive_failures += 1
+        if state.circuit == "half-open" or state.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            state.opens += 1
+            state.circuit = "open"
+            state.open_until = now + min(CIRCUIT_COOLDOWN * 2 ** (state.opens - 1), CIRCUIT_MAX_COOLDOWN)
+
+    @contextlib.contextmanager
+    def slot(self, host, default_timeout):
+        """Holds a slot for the block. A requests exception the block didn't report counts as a failure."""
+        slot = self.acquire(host, default_timeout)
+        try:
+            yield slot
+        except requests.exceptions.RequestException as e:
+            if slot.outcome is None:
+                slot.observe_error(e)
+            raise
+        finally:
+            self.release(slot)
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self, host, default_timeout):
+        slot = await self.acquire_async(host, default_timeout)
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+    def snapshot(self):
+        """Returns each host's current limit, timeout, latency and circuit state."""
+        now = time.monotonic()
+        hosts = []
+        with self._cond:
+            for host, state in sorted(self._hosts.items()):
+                paused_until = max(state.resume_at, state.open_until if state.circuit == "open" else 0.0)
+                hosts.append({
+                    "host": host,
+                    "limit": {"closed": int(state.limit), "half-open": 1, "open": 0}[state.circuit],
+                    "in_flight": state.in_flight,
+                    "circuit": state.circuit,
+                    "latency_ms": round(state.srtt * 1000, 1) if state.srtt is not None else None,
+                    "timeout_s": round(self._timeout(state, VALIDATE_TIMEOUT), 1),
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "last_error": state.last_error,
+                    "paused_s": round(max(0.0, paused_until - now), 1),
+                })
+        return hosts
+
+@st.cache_resource(show_spinner=False)
+def get_host_scheduler():
+    """Returns the process-wide outbound request scheduler."""
+    return HostScheduler()
+
+SCHEDULER = get_host_scheduler()
+
 # --- Helper Functions ---
 
-def validate_link(link):
-    """Validates a WhatsApp group link and extracts metadata."""
-    result = {"Group Name": "Unnamed Group", "Group Link": link, "Logo URL": "", "Status": "Error", "Description": ""}
+def process_lru_cache(maxsize):
+    """Like functools.lru_cache, but the memo survives Streamlit reruns.
+
+    Streamlit re-executes this module on every rerun, so a plain lru_cache would
+    start empty each time. The wrapped function is kept in st.cache_resource,
+    keyed by its name and bytecode so an edited function gets a fresh memo.
+    """
+    def decorator(func):
+        @st.cache_resource(show_spinner=False)
+        def memoized(qualname, code_digest):
+            return functools.lru_cache(maxsize=maxsize)(func)
+
+        code_digest = hashlib.sha1(func.__code__.co_code).hexdigest()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            return memoized(func.__qualname__, code_digest)(*args)
+
+        return wrapper
+    return decorator
+
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """Returns a process-wide requests session with a connection pool sized for validation."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=PER_HOST_CONCURRENCY, pool_maxsize=VALIDATION_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_HEAD_END_RE = re.compile(rb"</head\s*>", re.IGNORECASE)
+_META_TAG_RE = re.compile(r"""<meta\b((?:[^>"']|"[^"]*"|'[^']*')*)>""", re.IGNORECASE) # A ">" inside a quoted value doesn't end the tag
+_HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_TAG_ATTR_RE = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+
+def read_html_head(response, limit=HEAD_READ_LIMIT):
+    """Reads a streamed response until just past </head>. Returns (bytes_read, head_complete)."""
+    buffer = bytearray()
+    for chunk in response.iter_content(chunk_size=8192):
+        search_from = max(0, len(buffer) - 8)
+        buffer += chunk
+        match = _HEAD_END_RE.search(buffer, search_from)
+        if match:
+            return bytes(buffer[:match.end()]), True
+        if len(buffer) >= limit:
+            break
+    return bytes(buffer), False
+
+def drain_for_reuse(response, limit=KEEPALIVE_DRAIN_BYTES):
+    """Reads and discards the rest of a streamed body if at most `limit` bytes of it are left.
+
+    urllib3 closes a connection whose response is abandoned mid-body, so the next
+    request to the host pays a new TCP and TLS handshake. Draining a short remainder
+    returns the connection to the pool instead. Returns True if it was drained.
+    """
+    declared = response.headers.get("Content-Length", "")
+    started = response.raw.tell()
+    if declared.isdigit() and int(declared) - started > limit:
+        return False
     try:
-        response = requests.get(link, headers=get_headers(), timeout=20, allow_redirects=True)
-        response.raise_for_status() 
-
-        if WHATSAPP_DOMAIN in response.url:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title_tag = soup.find('meta', property='og:title')
-            image_tag = soup.find('meta', property='og:image')
-
-            group_name_raw = title_tag['content'] if title_tag and title_tag.get('content') else None
-            if group_name_raw:
-                group_name = html.unescape(str(group_name_raw)).strip()
-                result["Group Name"] = group_name if group_name else "Unnamed Group"
-            else:
-                result["Group Name"] = "Unnamed Group"
+        for _ in response.iter_content(chunk_size=16384):
+            if response.raw.tell() - started > limit:
+                return False
+    except requests.exceptions.RequestException:
+        return False
+    return True
+
+def read_limited(response, limit):
+    """Reads a streamed response body, or returns None as soon as it is known to exceed `limit` bytes."""
+    declared = response.headers.get("Content-Length", "")
+    if declared.isdigit() and int(declared) > limit:
+        return None
+    buffer = bytearray()
+    for chunk in response.iter_content(chunk_size=65536):
+        buffer += chunk
+        if len(buffer) > limit:
+            return None
+    return bytes(buffer)
+
+def extract_og_meta_fast(head_html):
+    """Pulls og:title and og:image out of a page head with regexes instead of a DOM.
+
+    Returns (title, image) with the same values BeautifulSoup's html.parser would give
+    for the first matching tags, or None if either tag is missing.
+    """
+    found = {}
+    for meta_match in _META_TAG_RE.finditer(_HTML_COMMENT_RE.sub("", head_html)):
+        attrs = {}
+        for name, double_quoted, single_quoted, bare in _TAG_ATTR_RE.findall(meta_match.group(1)):
+            attrs[name.lower()] = html.unescape(double_quoted or single_quoted or bare)
+        prop = attrs.get("property")
+        if prop in ("og:title", "og:image") and prop not in found:
+            found[prop] = attrs.get("content") or None
+            if len(found) == 2:
+                return found["og:title"], found["og:image"]
+    return None
+
+def extract_og_meta_soup(page_html):
+    """Reads og:title and og:image from a full BeautifulSoup parse. Returns (title, image)."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(page_html, 'html.parser')
+    title_tag = soup.find('meta', property='og:title')
+    image_tag = soup.find('meta', property='og:image')
+    group_name_raw = title_tag['content'] if title_tag and title_tag.get('content') else None
+    logo_url_raw = image_tag['content'] if image_tag and image_tag.get('content') else None
+    return group_name_raw, logo_url_raw
+
+def validate_link(link, session=None, slot=None):
+    """Validates a WhatsApp group link and extracts metadata.
+
+    The request runs in `slot`, a HostSlot already taken from the scheduler, or in a
+    slot of its own when none is given.
+    """
+    if slot is None:
+        try:
+            with SCHEDULER.slot(urlparse(link).netloc.lower(), VALIDATE_TIMEOUT) as slot:
+                return validate_link(link, session, slot)
+        except CircuitOpenError as e:
+            return failed_validation_result(link, f"Network Error: {str(e)[:50]}")
+    result = failed_validation_result(link, "Error")
+    with METRICS.timed("validate_link") as probe:
+        try:
+            http = session if session is not None else requests
+            with http.get(link, headers=get_headers(), timeout=slot.timeout, allow_redirects=True, stream=True) as response:
+                slot.observe(response)
+                if response.status_code >= 400:
+                    drain_for_reuse(response)
+                response.raise_for_status() 
+
+                if WHATSAPP_DOMAIN in response.url:
+                    encoding = response.encoding or "utf-8"
+                    head_bytes, head_complete = read_html_head(response)
+                    probe["bytes"] = len(head_bytes)
+                    og_meta = extract_og_meta_fast(head_bytes.decode(encoding, errors="replace")) if head_complete else None
+                    if og_meta is None:
+                        # Malformed or unusual markup: read the rest of the page and parse it properly.
+                        page_bytes = head_bytes + b"".join(response.iter_content(chunk_size=65536))
+                        probe["bytes"] = len(page_bytes)
+                        og_meta = extract_og_meta_soup(page_bytes.decode(encoding, errors="replace"))
+                    group_name_raw, logo_url_raw = og_meta
+
+                    if group_name_raw:
+                        group_name = html.unescape(str(group_name_raw)).strip()
+                        result["Group Name"] = group_name if group_name else "Unnamed Group"
+                    else:
+                        result["Group Name"] = "Unnamed Group"
+
+                    if logo_url_raw:
+                        result["Logo URL"] = html.unescape(str(logo_url_raw))
+                    
+                    result["Status"] = "Active"
+                    result["Description"] = ""
+                else:
+                    result["Status"] = EXPIRED_STATUS
+                drain_for_reuse(response)
+        except requests.exceptions.Timeout as e:
+            probe["error"] = type(e).__name__
+            slot.observe_error(e)
+            result["Status"] = "Network Error: Timeout"
+        except requests.exceptions.RequestException as e:
+            probe["error"] = type(e).__name__
+            if slot.outcome is None:
+                slot.observe_error(e)
+            result["Status"] = f"Network Error: {str(e)[:50]}"
+        except Exception as e:
+            probe["error"] = type(e).__name__
+            result["Status"] = f"Parsing Error: {str(e)[:50]}"
+    return result
 
+# --- Async Validation Engine ---
 
-            logo_url_raw = image_tag['content'] if image_tag and image_tag.get('content') else ""
-            if logo_url_raw:
-                result["Logo URL"] = html.unescape(str(logo_url_raw))
-            
-            result["Status"] = "Active"
-            result["Description"] = ""
-        else:
-            result["Status"] = "Expired or Invalid Link"
-    except requests.exceptions.Timeout:
-        result["Status"] = "Network Error: Timeout"
-    except requests.exceptions.RequestException as e:
-        result["Status"] = f"Network Error: {str(e)[:50]}"
-    except Exception as e:
-        result["Status"] = f"Parsing Error: {str(e)[:50]}"
-    return result
+def failed_validation_result(link, status):
+    """Returns a validate_link-shaped result for a link that could not be validated."""
+    return {"Group Name": "Unnamed Group", "Group Link": link, "Logo URL": "", "Status": status, "Description": ""}
 
-def scrape_google(query, top_n, progress_bar, status_text):
-    """Scrapes Google for WhatsApp links."""
+def is_cacheable_result(result):
+    """Tells whether a validation result may be cached.
+
+    Open circuits, back-offs and missed deadlines are made up by this process and say
+    nothing about the link, so they are not. Real network errors are, briefly (see
+    cache_ttl_for_status).
+    """
+    return not result["Status"].startswith(LOCAL_FAILURE_PREFIXES)
+
+class _ValidationPool:
+    """Runs validate_link on a worker pool, admitting requests through the host scheduler. Must be created inside a running event loop.
+
+    Links wait for a host slot on the event loop, so a throttled or failing host never
+    ties up the worker threads other hosts could use.
+    """
+
+    def __init__(self, max_concurrency=VALIDATION_CONCURRENCY, scheduler=None):
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._session = get_http_session()
+        self._scheduler = SCHEDULER if scheduler is None else scheduler
+        self._tasks = set()
+
+    async def _validate(self, link):
+        try:
+            async with self._scheduler.slot_async(urlparse(link).netloc.lower(), VALIDATE_TIMEOUT) as slot:
+                return await self._loop.run_in_executor(self._executor, validate_link, link, self._session, slot)
+        except CircuitOpenError as e:
+            return failed_validation_result(link, f"Network Error: {str(e)[:50]}")
+
+    def submit(self, link):
+        task = asyncio.ensure_future(self._validate(link))
+        self._tasks.add(task)
+        return task
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+async def validate_links_async(links, max_concurrency=VALIDATION_CONCURRENCY, deadline=VALIDATION_DEADLINE):
+    """Validates links concurrently and yields validate_link result dicts as they finish.
+
+    Requests share one pooled session and run on a worker pool. The host scheduler
+    sets each host's concurrency. Links still pending when the deadline passes are
+    yielded as timeouts, so every input link produces exactly one result.
+    """
+    links = list(dict.fromkeys(links))
+    if not links:
+        return
+    loop = asyncio.get_running_loop()
+    pool = _ValidationPool(max_concurrency)
+    tasks = {pool.submit(link): link for link in links}
+    pending = set(tasks)
+    ends_at = loop.time() + deadline
+    try:
+        while pending:
+            remaining = ends_at - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    yield task.result()
+                except Exception as e:
+                    yield failed_validation_result(tasks[task], f"Parsing Error: {str(e)[:50]}")
+        for task in pending:
+            yield failed_validation_result(tasks[task], DEADLINE_STATUS)
+    finally:
+        pool.close()
+
+def iterate_async(async_iterable):
+    """Drives an async generator on a private event loop and yields its items synchronously."""
+    loop = asyncio.new_event_loop()
+    iterator = async_iterable.__aiter__()
     try:
-        from googlesearch import search
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(iterator.aclose())
+        loop.close()
+
+def iter_validated_links(links, **kwargs):
+    """Synchronous wrapper around validate_links_async that yields results as they arrive."""
+    return iterate_async(validate_links_async(links, **kwargs))
+
+# --- Validation Cache ---
+
+def invite_code(link):
+    """Returns the invite code of a chat.whatsapp.com link, or None if it is not an invite link.
+
+    Scheme, host case, a www. prefix, an /invite/ path, trailing slashes, the query and
+    the fragment are all ignored, so every variant of a link maps to the same code.
+    """
+    link = link.strip()
+    parsed_url = urlparse(link if "//" in link else f"https://{link}")
+    host = parsed_url.netloc.lower().rsplit("@", 1)[-1].split(":", 1)[0]
+    if host not in (INVITE_HOST, f"www.{INVITE_HOST}"):
+        return None
+    match = INVITE_PATH_RE.match(parsed_url.path)
+    return match.group(1) if match else None
+
+def canonical_invite_link(link):
+    """Reduces a WhatsApp invite link to https://chat.whatsapp.com/<code>. Links without a code only lose their trailing slash."""
+    code = invite_code(link)
+    if code:
+        return WHATSAPP_DOMAIN + code
+    parsed_url = urlparse(link.strip())
+    return f"https://{parsed_url.netloc.lower()}{parsed_url.path.rstrip('/')}"
+
+def invite_code_hash(link):
+    """64-bit hash of a link's invite code, as stored in the dead-invite set."""
+    key = invite_code(link) or canonical_invite_link(link)
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big", signed=True)
+
+def cache_ttl_for_status(status):
+    """Returns how long a validation result with the given status stays fresh, in seconds."""
+    if status == "Active":
+        return ACTIVE_CACHE_TTL
+    if status == EXPIRED_STATUS:
+        return EXPIRED_CACHE_TTL
+    return ERROR_CACHE_TTL
+
+class LinkValidationCache:
+    """On-disk SQLite cache of validate_link results keyed by canonical invite link.
+
+    Alongside the TTL'd results it keeps a permanent set of invite codes found dead,
+    stored as 64-bit hashes. Revoked invites do not come back, so once a code is in
+    the set it is answered as expired without a request, even after its cached
+    result has expired. Only force_revalidate and refreshes check it again.
+    """
+
+    def __init__(self, path=VALIDATION_CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS link_validation ("
+                "link TEXT PRIMARY KEY, group_name TEXT, logo_url TEXT, status TEXT, "
+                "checked_at REAL, expires_at REAL)"
+            )
+            has_dead_set = self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dead_invite'").fetchone()
+            self._conn.execute("CREATE TABLE IF NOT EXISTS dead_invite (code_hash INTEGER PRIMARY KEY, found_at REAL) WITHOUT ROWID")
+            if not has_dead_set:
+                # Seed from results cached before the set existed.
+                rows = self._conn.execute("SELECT link, checked_at FROM link_validation WHERE status = ?", (EXPIRED_STATUS,)).fetchall()
+                self._conn.executemany("INSERT OR IGNORE INTO dead_invite VALUES (?, ?)", [(invite_code_hash(link), checked_at) for link, checked_at in rows])
+
+    def get_many(self, links, now=None):
+        """Returns {link: result} for the links that have a fresh cache entry or a code in the dead-invite set."""
+        now = time.time() if now is None else now
+        keys = {canonical_invite_link(link): link for link in links}
+        fresh = {}
+        key_list = list(keys)
+        with self._lock:
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT link, group_name, logo_url, status FROM link_validation "
+                    f"WHERE expires_at > ? AND link IN ({','.join('?' * len(chunk))})",
+                    [now, *chunk],
+                ).fetchall()
+                for key, group_name, logo_url, status in rows:
+                    link = keys[key]
+                    fresh[link] = {"Group Name": group_name, "Group Link": link, "Logo URL": logo_url, "Status": status, "Description": ""}
+            hashes = {invite_code_hash(key): link for key, link in keys.items() if link not in fresh}
+            hash_list = list(hashes)
+            dead = 0
+            for start in range(0, len(hash_list), 500):
+                chunk = hash_list[start:start + 500]
+                rows = self._conn.execute(f"SELECT code_hash FROM dead_invite WHERE code_hash IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                for (code_hash,) in rows:
+                    fresh[hashes[code_hash]] = failed_validation_result(hashes[code_hash], EXPIRED_STATUS)
+                    dead += 1
+        METRICS.count_cache("dead_invite", hits=dead, misses=len(hashes) - dead)
+        return fresh
+
+    def put(self, result, now=None):
+        """Stores a validate_link result with a TTL chosen from its status."""
+        now = time.time() if now is None else now
+        status = result.get("Status", "Error")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO link_validation VALUES (?, ?, ?, ?, ?, ?)",
+                (canonical_invite_link(result["Group Link"]), result.get("Group Name", "Unnamed Group"),
+                 result.get("Logo URL", ""), status, now, now + cache_ttl_for_status(status)),
+            )
+            if status == EXPIRED_STATUS:
+                self._conn.execute("INSERT OR IGNORE INTO dead_invite VALUES (?, ?)", (invite_code_hash(result["Group Link"]), now))
+            elif status == "Active":
+                self._conn.execute("DELETE FROM dead_invite WHERE code_hash = ?", (invite_code_hash(result["Group Link"]),))
+
+    def dead_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_invite").fetchone()[0]
+
+    def checked_at_many(self, links):
+        """Returns {link: checked_at} for the links that have ever been checked, fresh or not."""
+        keys = {canonical_invite_link(link): link for link in links}
+        checked = {}
+        key_list = list(keys)
+        with self._lock:
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT link, checked_at FROM link_validation WHERE link IN ({','.join('?' * len(chunk))})", chunk,
+                ).fetchall()
+                checked.update((keys[key], checked_at) for key, checked_at in rows)
+        return checked
+
+    def purge_expired(self, now=None):
+        """Deletes stale rows and returns how many were removed."""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM link_validation WHERE expires_at <= ?", (now,)).rowcount
+
+@st.cache_resource(show_spinner=False)
+def get_validation_cache():
+    """Returns the process-wide validation cache."""
+    return LinkValidationCache()
+
+def iter_validated_links_cached(links, cache=None, force_revalidate=False, stats=None, **kwargs):
+    """Yields validation results, serving fresh cache entries and only hitting the network for the rest.
+
+    `stats`, if given, is a dict whose "hits" and "misses" counters are updated in place.
+    """
+    cache = get_validation_cache() if cache is None else cache
+    stats = {} if stats is None else stats
+    stats.setdefault("hits", 0)
+    stats.setdefault("misses", 0)
+    links = list(dict.fromkeys(links))
+    cached = {} if force_revalidate else cache.get_many(links)
+    METRICS.count_cache("link_validation", hits=len(cached), misses=len(links) - len(cached))
+    for result in cached.values():
+        stats["hits"] += 1
+        yield result
+    for result in iter_validated_links([link for link in links if link not in cached], **kwargs):
+        stats["misses"] += 1
+        if is_cacheable_result(result):
+            cache.put(result)
+        yield result
+
+# --- Group Store ---
+
+class GroupRecord:
+    """One scraped group. Reads like a validate_link result dict through get() and [] so table and prompt builders accept it."""
+
+    __slots__ = ("link", "group_link", "group_name", "logo_url", "status", "description")
+
+    FIELDS = {"Group Link": "group_link", "Group Name": "group_name", "Logo URL": "logo_url", "Status": "status", "Description": "description"}
+
+    def __init__(self, group_link, group_name="Unnamed Group", logo_url="", status="Error", description=""):
+        self.link = canonical_invite_link(group_link)
+        self.group_link = group_link
+        self.group_name = group_name
+        self.logo_url = logo_url
+        self.status = status
+        self.description = description
+
+    @classmethod
+    def from_result(cls, result):
+        return cls(result["Group Link"], result.get("Group Name", "Unnamed Group"), result.get("Logo URL", ""),
+                   result.get("Status", "Error"), result.get("Description", "") or "")
+
+    def __getitem__(self, key):
+        return getattr(self, self.FIELDS[key])
+
+    def get(self, key, default=None):
+        attribute = self.FIELDS.get(key)
+        return getattr(self, attribute) if attribute else default
+
+    def as_row(self):
+        return (self.group_link, self.group_name, self.logo_url, self.status, self.description)
+
+    def as_dict(self):
+        return {"Group Name": self.group_name, "Group Link": self.group_link, "Logo URL": self.logo_url, "Status": self.status, "Description": self.description}
+
+def group_identity(result):
+    """Key under which two invite links count as the same group: the name, ignoring case and spacing, and the logo image path.
+
+    The logo's query string is left out because it carries per-fetch signatures.
+    """
+    name = " ".join(str(result.get("Group Name", "")).split()).casefold()
+    return name, urlparse(result.get("Logo URL") or "").path
+
+class DuplicateGroupFilter:
+    """Passes the first validation result per group_identity, so one group reached through several invite links gets one row."""
+
+    def __init__(self):
+        self._seen = set()
+        self.dropped = 0
+
+    def accept(self, result):
+        identity = group_identity(result)
+        if identity in self._seen:
+            self.dropped += 1
+            return False
+        self._seen.add(identity)
+        return True
+
+class GroupStore:
+    """Scraped groups keyed by canonical invite link, with a secondary index by name.
+
+    Lookup and updates by link are O(1). Groups that share a name stay separate
+    records. Insertion order is preserved for display.
+    """
+
+    def __init__(self, results=()):
+        self._records = {}
+        self._by_name = {}
+        for result in results:
+            self.add(result)
+
+    def _unindex(self, record):
+        self._by_name.get(record.group_name, {}).pop(record.link, None)
+
+    def _index(self, record):
+        self._by_name.setdefault(record.group_name, {})[record.link] = None
+
+    def add(self, result):
+        """Inserts or replaces a group from a validate_link result dict or a GroupRecord. Keeps an existing description."""
+        record = result if isinstance(result, GroupRecord) else GroupRecord.from_result(result)
+        existing = self._records.get(record.link)
+        if existing is not None:
+            self._unindex(existing)
+            if not record.description:
+                record.description = existing.description
+        self._records[record.link] = record
+        self._index(record)
+        return record
+
+    def get(self, link):
+        return self._records.get(canonical_invite_link(link))
+
+    def remove(self, link):
+        record = self._records.pop(canonical_invite_link(link), None)
+        if record is not None:
+            self._unindex(record)
+        return record
+
+    def apply_refresh(self, diff):
+        """Applies a refresh_groups diff: drops expired groups and takes new names and logos for live ones."""
+        for entry in diff["expired"]:
+            self.remove(entry["link"])
+        for entry in diff["active"] + diff["renamed"]:
+            self.add(entry["result"])
+
+    def update_description(self, link, description):
+        record = self.get(link)
+        if record is not None:
+            record.description = description
+        return record
+
+    def by_name(self, group_name):
+        return [self._records[link] for link in self._by_name.get(group_name, {})]
+
+    def links(self):
+        return list(self._records)
+
+    def label(self, link):
+        """Display name for a group; names shared by several links get the invite code appended."""
+        record = self._records[link]
+        if len(self._by_name.get(record.group_name, ())) > 1:
+            return f"{record.group_name} ({link.rsplit('/', 1)[-1]})"
+        return record.group_name
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __len__(self):
+        return len(self._records)
+
+    def __bool__(self):
+        return bool(self._records)
+
+    def to_rows(self):
+        """Compact serialization: a list of (group_link, name, logo_url, status, description) tuples."""
+        return [record.as_row() for record in self._records.values()]
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(GroupRecord(*row) for row in rows)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_rows(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_rows(json.load(f))
+
+# --- Result Page Cache ---
+
+class PageCache:
+    """On-disk HTTP cache of result pages for conditional re-fetches.
+
+    Pages that came with an ETag or Last-Modified are stored zlib-compressed along
+    with the invite links extracted from them. The next fetch sends If-None-Match /
+    If-Modified-Since, and a 304 answer reuses the stored links without downloading
+    or parsing the page. The stored body is only parsed again if PAGE_LINKS_VERSION
+    changed. Once compressed bodies exceed `max_bytes`, the least recently used
+    pages are evicted.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_bytes=PAGE_CACHE_MAX_BYTES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"revalidated": 0, "fetched": 0, "bytes_saved": 0, "bytes_downloaded": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS result_page ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, body_bytes INTEGER, "
+                "links TEXT, links_version INTEGER, stored_bytes INTEGER, last_used REAL)"
+            )
+
+    def conditional_headers(self, url):
+        """Returns the If-None-Match / If-Modified-Since headers for a cached page, or {}."""
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM result_page WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return {}
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def revalidated(self, url):
+        """Returns the stored link set for a page the server answered 304 for, or None if it is no longer cached."""
+        with self._lock:
+            row = self._conn.execute("SELECT body, body_bytes, links, links_version FROM result_page WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        body, body_bytes, links_json, links_version = row
+        if links_version == PAGE_LINKS_VERSION:
+            links = set(json.loads(links_json))
+        else:
+            links = extract_whatsapp_links(zlib.decompress(body))
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE result_page SET last_used = ?, links = ?, links_version = ? WHERE url = ?",
+                               (time.time(), json.dumps(sorted(links)), PAGE_LINKS_VERSION, url))
+            self._stats["revalidated"] += 1
+            self._stats["bytes_saved"] += body_bytes
+        return links
+
+    def store(self, url, response, links):
+        """Caches a 200 response and its links if the server gave a validator to revalidate it with."""
+        with self._lock:
+            self._stats["fetched"] += 1
+            self._stats["bytes_downloaded"] += len(response.content)
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        body = zlib.compress(response.content, 6)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_page VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, len(response.content), json.dumps(sorted(links)), PAGE_LINKS_VERSION, len(body), time.time()),
+            )
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used pages until the compressed bodies fit in max_bytes."""
+        with self._lock, self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM result_page").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            doomed = []
+            for url, stored_bytes in self._conn.execute("SELECT url, stored_bytes FROM result_page ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                doomed.append((url,))
+                total -= stored_bytes
+            self._conn.executemany("DELETE FROM result_page WHERE url = ?", doomed)
+
+    def stats(self):
+        """Returns revalidation counts, bytes saved by 304s and the current size of the cache."""
+        with self._lock:
+            pages, stored = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(stored_bytes), 0) FROM result_page").fetchone()
+            return {**self._stats, "pages": pages, "stored_bytes": stored}
+
+@st.cache_resource(show_spinner=False)
+def get_page_cache():
+    """Returns the process-wide result page cache."""
+    return PageCache()
+
+# --- Logo Thumbnails ---
+
+class LogoCache:
+    """Content-addressed on-disk store of group logo thumbnails.
+
+    Thumbnails live in `directory` named by the SHA-256 of their bytes and their image
+    format, and a small SQLite index maps canonical invite links to both. Entries
+    older than LOGO_TTL are refetched. The store's size is tracked as thumbnails are
+    added; only when it passes `max_bytes` is the directory scanned and the least
+    recently used files evicted, down to LOGO_CACHE_LOW_WATER of the cap.
+    """
+
+    def __init__(self, directory=LOGO_CACHE_DIR, max_bytes=LOGO_CACHE_MAX_BYTES, ttl=LOGO_TTL, memo_size=LOGO_INDEX_MEMO_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memo_size = memo_size
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._index_memo = {} # link -> (digest, fetched_at, image_format), saves a query per table row on every rerun
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS logo_index (link TEXT PRIMARY KEY, digest TEXT, fetched_at REAL, format TEXT)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(logo_index)")}
+            if "format" not in columns:
+                # Older entries were all labelled WebP whatever they held; a NULL format makes them refetch.
+                self._conn.execute("ALTER TABLE logo_index ADD COLUMN format TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS logo_index_digest ON logo_index (digest)") # For eviction
+        self._total_bytes = sum(size for _, size, _ in self._scan())
+
+    def _path(self, digest, image_format):
+        return os.path.join(self.directory, f"{digest}.{image_format}")
+
+    def _scan(self):
+        """Returns (mtime, size, name) for every thumbnail file in the store."""
+        suffixes = tuple(f".{image_format}" for image_format in LOGO_MIME_TYPES)
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(suffixes):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.name))
+        return entries
+
+    def _remember(self, key, row):
+        """Memoizes an index row, dropping the oldest once memo_size is reached. Call with the lock held."""
+        if key not in self._index_memo and len(self._index_memo) >= self.memo_size:
+            self._index_memo.pop(next(iter(self._index_memo)))
+        self._index_memo[key] = row
+
+    def thumbnail_for(self, group_link, now=None):
+        """Returns (digest, image_format) of a fresh, still-present thumbnail for the group, or None."""
+        now = time.time() if now is None else now
+        key = canonical_invite_link(group_link)
+        row = self._index_memo.get(key)
+        if row is None:
+            with self._lock:
+                row = self._conn.execute("SELECT digest, fetched_at, format FROM logo_index WHERE link = ?", (key,)).fetchone()
+                if row:
+                    self._remember(key, row)
+        if not row or row[1] + self.ttl <= now or row[2] not in LOGO_MIME_TYPES:
+            return None
+        try:
+            os.utime(self._path(row[0], row[2])) # Recency for LRU eviction; fails if the file was evicted
+        except OSError:
+            return None
+        return row[0], row[2]
+
+    def read(self, digest, image_format):
+        with open(self._path(digest, image_format), "rb") as f:
+            return f.read()
+
+    def put(self, group_link, thumbnail_bytes, image_format):
+        digest = hashlib.sha256(thumbnail_bytes).hexdigest()
+        path = self._path(digest, image_format)
+        added = 0
+        if not os.path.exists(path):
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(thumbnail_bytes)
+            os.replace(temp_path, path)
+            added = len(thumbnail_bytes)
+        key, fetched_at = canonical_invite_link(group_link), time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO logo_index VALUES (?, ?, ?, ?)", (key, digest, fetched_at, image_format))
+            self._remember(key, (digest, fetched_at, image_format))
+            self._total_bytes += added
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+        return digest
+
+    def evict(self):
+        """Deletes least recently used thumbnails, and their index rows, until the store is back under its low-water mark.
+
+        Another thread already evicting is left to it.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * LOGO_CACHE_LOW_WATER
+            evicted = []
+            for _, size, name in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+                evicted.append(tuple(name.split(".", 1)))
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM logo_index WHERE digest = ? AND format = ?", evicted)
+                evicted = set(evicted)
+                for key, row in list(self._index_memo.items()):
+                    if (row[0], row[2]) in evicted:
+                        del self._index_memo[key]
+                self._total_bytes = total
+        finally:
+            self._evict_lock.release()
+
+@st.cache_resource(show_spinner=False)
+def get_logo_cache():
+    """Returns the process-wide logo cache."""
+    return LogoCache()
+
+def logo_image_format(image_bytes):
+    """Returns the format of an image from its magic bytes ("webp", "png", "jpeg" or "gif"), or None."""
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "webp"
+    if image_bytes.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if image_bytes.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if image_bytes.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    return None
+
+def make_logo_thumbnail(image_bytes, size=LOGO_THUMB_SIZE):
+    """Center-crops and downscales a logo to a size x size thumbnail.
+
+    Returns the original bytes if Pillow isn't installed or the image can't be
+    decoded, so the caller can still cache something small enough to inline; check
+    the result's real format with logo_image_format.
+    """
+    try:
+        from PIL import Image, ImageOps
     except ImportError:
-        st.error("The 'googlesearch-python' library is not installed. Please install it by running: pip install googlesearch-python")
-        return []
+        return image_bytes
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+            thumbnail = ImageOps.fit(image, (size, size), method=Image.LANCZOS)
+            output = io.BytesIO()
+            thumbnail.save(output, format=LOGO_THUMB_FORMAT, quality=80)
+            return output.getvalue()
+    except Exception:
+        return image_bytes
+
+def fetch_logo_thumbnail(group_link, logo_url, cache, session=None):
+    """Downloads a logo, thumbnails it and stores it under the group's link. Returns the digest or None."""
+    if not logo_url:
+        return None
+    cached = cache.thumbnail_for(group_link)
+    METRICS.count_cache("logo", hits=bool(cached), misses=not cached)
+    if cached:
+        return cached[0]
+    http = session if session is not None else requests
+    with METRICS.timed("logo_fetch") as probe, SCHEDULER.slot(urlparse(logo_url).netloc.lower(), LOGO_FETCH_TIMEOUT) as slot:
+        with http.get(logo_url, headers=get_headers(), timeout=slot.timeout, stream=True) as response:
+            slot.observe(response)
+            response.raise_for_status()
+            image_bytes = read_limited(response, LOGO_MAX_DOWNLOAD_BYTES)
+        probe["bytes"] = len(image_bytes or b"")
+    if image_bytes is None:
+        return None
+    thumbnail = make_logo_thumbnail(image_bytes)
+    image_format = logo_image_format(thumbnail)
+    if image_format is None or len(thumbnail) > LOGO_MAX_INLINE_BYTES:
+        return None
+    return cache.put(group_link, thumbnail, image_format)
+
+class LogoFetcher:
+    """Fetches and caches logo thumbnails in the background while validation results stream in."""
+
+    def __init__(self, cache=None, max_workers=LOGO_WORKERS):
+        self.cache = get_logo_cache() if cache is None else cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._session = get_http_session()
+        self._futures = []
+
+    def submit(self, result):
+        if result.get("Logo URL"):
+            self._futures.append(self._executor.submit(fetch_logo_thumbnail, result["Group Link"], result["Logo URL"], self.cache, self._session))
+
+    def wait(self, timeout=LOGO_WAIT_TIMEOUT):
+        """Waits up to `timeout` seconds for outstanding fetches, then gives up on the rest. Returns how many finished."""
+        done, _ = wait_futures(self._futures, timeout=timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return sum(1 for future in done if not future.exception() and future.result())
+
+@process_lru_cache(maxsize=4096)
+def _logo_data_uri(digest, image_format):
+    return f"data:{LOGO_MIME_TYPES[image_format]};base64,{base64.b64encode(get_logo_cache().read(digest, image_format)).decode('ascii')}"
+
+def logo_src_for_group(group):
+    """Returns an inline thumbnail for the group if one is cached, else its remote Logo URL."""
+    link = group.get("Group Link")
+    if link:
+        try:
+            cached = get_logo_cache().thumbnail_for(link)
+            if cached:
+                return _logo_data_uri(*cached)
+        except (OSError, sqlite3.Error):
+            pass
+    return str(group.get("Logo URL", ""))
+
+def search_result_urls(query, top_n):
+    """Runs the Google search and returns result page URLs. Raises on failure."""
+    from googlesearch import search
+    with METRICS.timed("google_search"):
+        return list(search(query, num_results=top_n, lang="en", sleep_interval=2))
 
+def google_search_urls(query, top_n, status_text):
+    """Runs the Google search and returns result page URLs, reporting failures in the UI."""
     status_text.text(f"Fetching Google search results for: '{query}'...")
-    links = set()
     try:
-        search_results = list(search(query, num_results=top_n, lang="en", sleep_interval=2))
+        search_results = search_result_urls(query, top_n)
+    except ImportError:
+        st.error("The 'googlesearch-python' library is not installed. Please install it by running: pip install googlesearch-python")
+        return []
     except Exception as e:
         st.error(f"Google search failed: {e}. Try reducing 'Google Results to Scrape' or check your connection.")
         return []
@@ -210,22 +1564,119 @@ def scrape_google(query, top_n, progress_bar, status_text):
     if not search_results:
         status_text.warning("No search results returned from Google.")
         return []
+    return search_results
+
+def is_listable_group(result):
+    """True for validation results that belong in the groups table: active and named."""
+    return result["Status"] == "Active" and result["Group Name"] != "Unnamed Group"
+
+def extract_whatsapp_links_soup(page_html):
+    """Reference link extraction with a full BeautifulSoup parse. Kept for fallback and differential checks."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(page_html, 'html.parser')
+    return normalize_invite_hrefs(a_tag['href'] for a_tag in soup.find_all('a', href=True) if is_invite_href(a_tag['href']))
+
+def is_invite_href(href):
+    """Cheap pre-filter for hrefs that may be invite links; invite_code makes the real decision."""
+    return bool(href) and INVITE_HOST in href.lower()
+
+class _WhatsAppAnchorHarvester(html.parser.HTMLParser):
+    """Collects raw href values of <a> tags that point at the invite host, without building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.hrefs = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if is_invite_href(href):
+                self.hrefs.add(href)
+
+    handle_startendtag = handle_starttag
+
+def normalize_invite_hrefs(hrefs):
+    """Reduces raw invite hrefs to canonical https://chat.whatsapp.com/<code> links, one per code. Hrefs without a code are dropped."""
+    links = set()
+    for href in set(hrefs):
+        code = invite_code(html.unescape(href))
+        if code:
+            links.add(WHATSAPP_DOMAIN + code)
+    return links
+
+def extract_whatsapp_links(page_html):
+    """Returns the set of cleaned WhatsApp invite links found in a result page's anchors.
+
+    Pages that never mention the invite host are skipped outright; the rest go through a
+    tag-level parser that only looks at <a> start tags.
+    """
+    if isinstance(page_html, bytes):
+        if not INVITE_HOST_BYTES_RE.search(page_html):
+            return set()
+        page_html = page_html.decode("utf-8", errors="replace")
+    elif not INVITE_HOST_RE.search(page_html):
+        return set()
+    harvester = _WhatsAppAnchorHarvester()
+    try:
+        harvester.feed(page_html)
+        harvester.close()
+    except Exception:
+        return extract_whatsapp_links_soup(page_html)
+    return normalize_invite_hrefs(harvester.hrefs)
+
+def _get_result_page(url, session, extra_headers):
+    with METRICS.timed("page_fetch") as probe, SCHEDULER.slot(urlparse(url).netloc.lower(), PAGE_FETCH_TIMEOUT) as slot:
+        response = session.get(url, headers={**get_headers(), **extra_headers}, timeout=slot.timeout)
+        slot.observe(response)
+        response.raise_for_status()
+        probe["bytes"] = len(response.content)
+    return response
+
+def fetch_whatsapp_links(url, session, timings=None, page_cache=None):
+    """Downloads one result page and returns the WhatsApp links on it.
+
+    Pages in the page cache are fetched conditionally; a 304 reuses their stored links.
+    If `timings` is a list, a dict with the page's fetch and parse times is appended to it.
+    """
+    page_cache = get_page_cache() if page_cache is None else page_cache
+    started = time.perf_counter()
+    response = _get_result_page(url, session, page_cache.conditional_headers(url))
+    links = page_cache.revalidated(url) if response.status_code == 304 else None
+    if response.status_code == 304 and links is None:
+        # Evicted while the request was in flight, so there is nothing to reuse.
+        response = _get_result_page(url, session, {})
+    fetched = time.perf_counter()
+    METRICS.count_cache("result_page", hits=links is not None, misses=links is None)
+    if links is None:
+        # Only decode (and possibly charset-sniff) pages that can contain invite links.
+        with METRICS.timed("page_parse"):
+            links = extract_whatsapp_links(response.text) if INVITE_HOST_BYTES_RE.search(response.content) else set()
+        page_cache.store(url, response, links)
+    if timings is not None:
+        timings.append({
+            "URL": url[:70],
+            "Fetch (ms)": round((fetched - started) * 1000, 1),
+            "Parse (ms)": round((time.perf_counter() - fetched) * 1000, 1),
+            "KiB": round(len(response.content) / 1024, 1),
+            "Links": len(links),
+            "Cached": response.status_code == 304,
+        })
+    return links
+
+def scrape_google(query, top_n, progress_bar, status_text, timings=None, page_cache=None):
+    """Scrapes Google for WhatsApp links."""
+    search_results = google_search_urls(query, top_n, status_text)
+    if not search_results:
+        return []
 
     progress_bar.progress(0.1)
 
+    links = set()
     with requests.Session() as session:
         for i, url in enumerate(search_results):
             status_text.text(f"Scraping page {i+1}/{len(search_results)}: {url[:70]}...")
             try:
-                response = session.get(url, headers=get_headers(), timeout=15)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
-                for a_tag in soup.find_all('a', href=True):
-                    href = a_tag['href']
-                    if href and WHATSAPP_DOMAIN in href:
-                        parsed_url = urlparse(href)
-                        clean_link = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}"
-                        links.add(clean_link)
+                links.update(fetch_whatsapp_links(url, session, timings, page_cache))
                 progress_bar.progress(0.1 + (i + 1) / len(search_results) * 0.4)
             except requests.exceptions.RequestException as e:
                 st.warning(f"Error scraping {url[:50]}: {type(e).__name__}. Skipping.")
@@ -234,75 +1685,1285 @@ def scrape_google(query, top_n, progress_bar, status_text):
             time.sleep(0.5) 
     return list(links)
 
+# --- Pipelined Scrape & Validate ---
+
+async def scrape_and_validate_async(page_urls, cache=None, force_revalidate=False, stats=None, page_delay=0.5, timings=None,
+                                    max_concurrency=VALIDATION_CONCURRENCY, deadline=None, page_cache=None):
+    """Fetches result pages one by one and validates each new link as soon as it is found.
+
+    Yields ("page", index, url, error, new_link_count) after every result page and
+    ("result", result_dict) for every unique link. Links are deduplicated across pages
+    and served from the validation cache when fresh. If the deadline passes, scraping
+    stops and unfinished links are yielded as timeouts.
+    """
+    loop = asyncio.get_running_loop()
+    cache = get_validation_cache() if cache is None else cache
+    stats = {} if stats is None else stats
+    stats.setdefault("hits", 0)
+    stats.setdefault("misses", 0)
+    deadline = VALIDATION_DEADLINE + 15 * len(page_urls) if deadline is None else deadline
+    ends_at = loop.time() + deadline
+    events = asyncio.Queue()
+    seen = set()
+    unresolved = set()
+    pool = _ValidationPool(max_concurrency)
+    page_session = requests.Session()
+
+    def _on_validated(link, task):
+        if task.cancelled():
+            return
+        try:
+            result = task.result()
+        except Exception as e:
+            result = failed_validation_result(link, f"Parsing Error: {str(e)[:50]}")
+        if is_cacheable_result(result):
+            cache.put(result)
+        events.put_nowait(("result", result))
+
+    async def _scrape_pages():
+        for i, url in enumerate(page_urls):
+            error = None
+            new_links = []
+            try:
+                found = await loop.run_in_executor(None, fetch_whatsapp_links, url, page_session, timings, page_cache)
+                new_links = sorted(found - seen)
+                seen.update(new_links)
+            except Exception as e:
+                error = e
+            unresolved.update(new_links)
+            cached = {} if force_revalidate else cache.get_many(new_links)
+            METRICS.count_cache("link_validation", hits=len(cached), misses=len(new_links) - len(cached))
+            events.put_nowait(("page", i, url, error, len(new_links)))
+            for link in new_links:
+                if link in cached:
+                    stats["hits"] += 1
+                    events.put_nowait(("result", cached[link]))
+                else:
+                    stats["misses"] += 1
+                    pool.submit(link).add_done_callback(functools.partial(_on_validated, link))
+            if i < len(page_urls) - 1:
+                await asyncio.sleep(page_delay)
+        events.put_nowait(("done",))
+
+    scraper = asyncio.ensure_future(_scrape_pages())
+    scraping_done = False
+    try:
+        while not scraping_done or unresolved:
+            remaining = ends_at - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if event[0] == "done":
+                scraping_done = True
+                continue
+            if event[0] == "result":
+                unresolved.discard(event[1]["Group Link"])
+            yield event
+        for link in sorted(unresolved):
+            yield ("result", failed_validation_result(link, DEADLINE_STATUS))
+    finally:
+        scraper.cancel()
+        pool.close()
+        page_session.close()
+
+def iter_scrape_and_validate(page_urls, **kwargs):
+    """Synchronous wrapper around scrape_and_validate_async."""
+    return iterate_async(scrape_and_validate_async(page_urls, **kwargs))
+
+# --- Refresh Existing Groups ---
+
+def parse_article_groups(article_html):
+    """Pulls the groups out of an article's table: one per row that holds an invite link.
+
+    The row's first cell is taken as the group name and, when the row has three or
+    more cells, the second as its description. Invite links outside any table row
+    are kept with an unknown name.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(article_html, 'html.parser')
+    groups = {}
+    for row in soup.find_all('tr'):
+        links = [canonical_invite_link(a_tag['href']) for a_tag in row.find_all('a', href=True) if invite_code(a_tag['href'])]
+        if not links:
+            continue
+        link = links[0]
+        cells = [cell.get_text(" ", strip=True) for cell in row.find_all(['td', 'th'])]
+        groups.setdefault(link, {"Group Name": cells[0] if cells and cells[0] else "Unnamed Group", "Group Link": link,
+                                 "Logo URL": "", "Status": "Active", "Description": cells[1] if len(cells) >= 3 else ""})
+    for link in sorted(extract_whatsapp_links(article_html) - set(groups)):
+        groups[link] = {"Group Name": "Unnamed Group", "Group Link": link, "Logo URL": "", "Status": "Active", "Description": ""}
+    return list(groups.values())
+
+def refresh_groups(groups, cache=None, max_concurrency=REFRESH_CONCURRENCY, deadline=VALIDATION_DEADLINE, on_result=None):
+    """Revalidates groups we already have, longest-unchecked first, and diffs the results against them.
+
+    Never searches or scrapes: every link goes straight to validate_link. Returns a
+    dict of "active", "renamed", "expired" and "unreachable" lists whose entries hold
+    "link", "old_name", "new_name", "status" and the validate_link "result".
+    Unreachable links (network errors, deadline) say nothing about the group, so
+    they are neither cached nor counted as expired. `on_result(done, total)` is
+    called after every link.
+    """
+    cache = get_validation_cache() if cache is None else cache
+    previous = {}
+    for group in groups:
+        previous.setdefault(group["Group Link"], group)
+    checked_at = cache.checked_at_many(previous)
+    links = sorted(previous, key=lambda link: checked_at.get(link, 0.0))
+    diff = {"active": [], "renamed": [], "expired": [], "unreachable": []}
+    for done, result in enumerate(iter_validated_links(links, max_concurrency=max_concurrency, deadline=deadline), 1):
+        old_name, new_name = previous[result["Group Link"]].get("Group Name", "Unnamed Group"), result["Group Name"]
+        if result["Status"] == "Active":
+            renamed = new_name != old_name and "Unnamed Group" not in (old_name, new_name)
+            kind = "renamed" if renamed else "active"
+        elif result["Status"] == EXPIRED_STATUS:
+            kind = "expired"
+        else:
+            kind = "unreachable"
+        if kind != "unreachable":
+            cache.put(result)
+        diff[kind].append({"link": result["Group Link"], "old_name": old_name, "new_name": new_name, "status": result["Status"], "result": result})
+        if on_result:
+            on_result(done, len(links))
+    return diff
+
+@process_lru_cache(maxsize=TABLE_ROW_CACHE_SIZE)
+def _display_row_html(group_name, logo_src, desc, link):
+    """Renders one display-table row. Memoized on the row's contents, so unchanged rows cost a dict lookup."""
+    group_name = html.escape(group_name)
+    logo_url = html.escape(logo_src)
+    desc = html.escape(desc)
+    link = html.escape(link)
+    return (
+        '<tr>'
+        f'<td><img src="{logo_url}" class="group-logo-img" alt="{group_name} Logo" onerror="this.style.display=\'none\'"></td>'
+        f'<td>{group_name}</td>'
+        f'<td>{desc}</td>'
+        f'<td><a href="{link}" class="join-button" target="_blank" rel="nofollow noopener noreferrer">Join</a></td>'
+        '</tr>'
+    )
+
 def generate_html_table_for_display(groups_list):
     """Generates an HTML table for displaying groups in Streamlit."""
     if not groups_list:
         return "<p style='text-align:center;color:#777;'>No active groups found or selected.</p>"
 
-    html_output = '<table class="whatsapp-groups-table" aria-label="WhatsApp Groups">'
-    html_output += '<thead><tr><th>Logo</th><th>Group Name</th><th>Description</th><th>Link</th></tr></thead><tbody>'
-    for group in groups_list:
-        group_name = html.escape(str(group.get("Group Name", "N/A")))
-        logo_url = html.escape(str(group.get("Logo URL", "")))
-        desc = html.escape(str(group.get("Description", "Description pending...")))
-        link = html.escape(str(group.get("Group Link", "#")))
-        
-        html_output += '<tr>'
-        html_output += f'<td><img src="{logo_url}" class="group-logo-img" alt="{group_name} Logo" onerror="this.style.display=\'none\'"></td>'
-        html_output += f'<td>{group_name}</td>'
-        html_output += f'<td>{desc}</td>'
-        html_output += f'<td><a href="{link}" class="join-button" target="_blank" rel="nofollow noopener noreferrer">Join</a></td>'
-        html_output += '</tr>'
-    html_output += '</tbody></table>'
-    return html_output
+    rows = [
+        _display_row_html(
+            str(group.get("Group Name", "N/A")),
+            logo_src_for_group(group),
+            str(group.get("Description", "Description pending...")),
+            str(group.get("Group Link", "#")),
+        )
+        for group in groups_list
+    ]
+    return (
+        '<table class="whatsapp-groups-table" aria-label="WhatsApp Groups">'
+        '<thead><tr><th>Logo</th><th>Group Name</th><th>Description</th><th>Link</th></tr></thead><tbody>'
+        f'{"".join(rows)}</tbody></table>'
+    )
+
+def paginate_groups(groups_list, page, page_size=TABLE_PAGE_SIZE):
+    """Returns (rows on the page, page count) for a 1-based page number, clamped to the valid range."""
+    page_count = max(1, -(-len(groups_list) // page_size))
+    page = min(max(1, page), page_count)
+    return groups_list[(page - 1) * page_size:page * page_size], page_count
+
+@process_lru_cache(maxsize=TABLE_ROW_CACHE_SIZE)
+def _ai_row_html(group_name, desc, link):
+    group_name = html.escape(group_name)
+    desc = html.escape(desc or f"A community for {group_name}.")
+    link = html.escape(link)
+    return f'<tr><td style="padding: 5px;">{group_name}</td><td style="padding: 5px;">{desc}</td><td style="padding: 5px;"><a href="{link}" target="_blank" rel="nofollow noopener noreferrer">Join Group</a></td></tr>\n'
 
 def generate_html_table_for_ai(groups_list):
     """Generates a simple HTML table for the AI prompt."""
     if not groups_list:
         return "<p>No groups selected for the article.</p>"
     
-    html_output = '<table border="1" style="border-collapse: collapse; width: 100%;">\n'
-    html_output += '<tr><th style="padding: 5px; text-align: left;">Group Name</th><th style="padding: 5px; text-align: left;">Description</th><th style="padding: 5px; text-align: left;">Link</th></tr>\n'
+    rows = "".join(
+        _ai_row_html(str(group.get("Group Name", "N/A")), str(group.get("Description") or ""), str(group.get("Group Link", "#")))
+        for group in groups_list
+    )
+    return (
+        '<table border="1" style="border-collapse: collapse; width: 100%;">\n'
+        '<tr><th style="padding: 5px; text-align: left;">Group Name</th><th style="padding: 5px; text-align: left;">Description</th><th style="padding: 5px; text-align: left;">Link</th></tr>\n'
+        f'{rows}</table>'
+    )
+
+def build_post_title(title_template, target_keyword, current_year):
+    return title_template.replace("{target_keyword}", target_keyword).replace("[Current Year]", current_year)
+
+def build_post_slug(target_keyword, current_year):
+    return f"{target_keyword.lower().replace(' ', '-')}-whatsapp-groups-{current_year.lower()}"
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def compact_group_line(group):
+    """One group as a plain "name | description" line for the prompt. Links stay out; they only go in the stitched table."""
+    name = " ".join(str(group.get("Group Name") or "Unnamed Group").split())
+    description = " ".join(str(group.get("Description") or "").split())
+    return f"- {name} | {description}" if description else f"- {name}"
+
+def build_article_prompt(target_keyword, lsi_keywords, local_keywords, post_title, groups_list, current_year,
+                         token_budget=ARTICLE_PROMPT_TOKEN_BUDGET):
+    """Assembles the article prompt within `token_budget` estimated tokens.
+
+    The model writes the body and leaves ARTICLE_TABLE_MARKER where the groups table
+    goes; the table itself is rendered here and joined in by stitch_article_table, so
+    the prompt only needs a compact list of groups for context. Groups that do not
+    fit the budget are left out of that list but stay in the table.
+
+    Returns a dict with "prompt", "table_html" and "stats" (prompt_tokens, budget,
+    groups_listed, groups_total, over_budget).
+    """
+    prompt_payload = SYSTEM_PROMPT.format(
+        target_keyword=target_keyword,
+        lsi_keywords=lsi_keywords,
+        local_keywords=local_keywords if local_keywords else "Not specified",
+    )
+    prompt_payload += f"\n\n**Article Title to Generate:** {post_title}\n"
+    prompt_payload += (
+        f"\n**Groups table:** Do not write the table yourself. In the 'Top {target_keyword} WhatsApp Groups of {current_year}' "
+        f"section, put the line {ARTICLE_TABLE_MARKER} on its own where the table belongs; the full table of "
+        f"{len(groups_list)} verified groups with join links will be inserted there.\n"
+    )
+    closing = f"\nRemember to replace `[Current Year]` in the content with `{current_year}`."
+    header = "\n**Groups in the table (name | description), for context only:**\n"
+    used_tokens = estimate_tokens(prompt_payload + header + closing)
+    lines = []
     for group in groups_list:
-        group_name = html.escape(str(group.get("Group Name", "N/A")))
-        desc = html.escape(str(group.get("Description") or f"A community for {group_name}."))
-        link = html.escape(str(group.get("Group Link", "#")))
-        html_output += f'<tr><td style="padding: 5px;">{group_name}</td><td style="padding: 5px;">{desc}</td><td style="padding: 5px;"><a href="{link}" target="_blank" rel="nofollow noopener noreferrer">Join Group</a></td></tr>\n'
-    html_output += '</table>'
-    return html_output
-
-def get_ai_description_for_group(group_name, genai_model):
-    """Generates a short description for a WhatsApp group using Gemini."""
+        line = compact_group_line(group) + "\n"
+        line_tokens = estimate_tokens(line)
+        if used_tokens + line_tokens > token_budget:
+            break
+        lines.append(line)
+        used_tokens += line_tokens
+    if lines:
+        prompt_payload += header + "".join(lines)
+        if len(lines) < len(groups_list):
+            prompt_payload += f"- ...and {len(groups_list) - len(lines)} more groups in the table.\n"
+    prompt_payload += closing
+    prompt_tokens = estimate_tokens(prompt_payload)
+    return {
+        "prompt": prompt_payload,
+        "table_html": generate_html_table_for_ai(groups_list),
+        "stats": {"prompt_tokens": prompt_tokens, "budget": token_budget, "groups_listed": len(lines),
+                  "groups_total": len(groups_list), "over_budget": prompt_tokens > token_budget},
+    }
+
+def stitch_article_table(article_text, table_html, complete=True):
+    """Puts the groups table where the model left ARTICLE_TABLE_MARKER.
+
+    Tolerates models that drop or repeat the marker: extra markers are removed, and
+    a finished article without one gets the table after its "Top ..." heading, or at
+    the end. A partial article without the marker is returned as is, so a
+    continuation can still place it. Safe to call again on stitched text.
+    """
+    if table_html in article_text:
+        return article_text.replace(ARTICLE_TABLE_MARKER, "")
+    if ARTICLE_TABLE_MARKER in article_text:
+        before, after = article_text.split(ARTICLE_TABLE_MARKER, 1)
+        return before + table_html + after.replace(ARTICLE_TABLE_MARKER, "")
+    if not complete:
+        return article_text
+    heading = re.search(r"<h2[^>]*>[^<]*\bTop\b.*?</h2>|^#{2}\s.*\bTop\b.*$", article_text, re.IGNORECASE | re.MULTILINE)
+    if heading:
+        return f"{article_text[:heading.end()]}\n{table_html}\n{article_text[heading.end():]}"
+    return f"{article_text}\n{table_html}"
+
+def article_cost(llm_backend, prompt_tokens, output_tokens):
+    """Estimated USD cost of one article call from the backend's per-million-token prices."""
+    return (prompt_tokens * llm_backend.input_price_per_mtok + output_tokens * llm_backend.output_price_per_mtok) / 1e6
+
+def clean_ai_description(text, group_name):
+    """Flattens and trims a model-written description to the table's length budget."""
+    desc_text = str(text or "").strip().replace("\n", " ")
+    if len(desc_text) > 70: 
+        desc_text = desc_text[:67] + "..."
+    return desc_text if desc_text else f"Explore the {group_name} community."
+
+def build_description_prompt(group_name):
+    return f"Write a concise, engaging WhatsApp group description (strictly 30-60 characters) for a group named '{group_name}'. Focus on its main topic or benefit. Output only the description text, nothing else."
+
+def build_batch_description_prompt(group_names):
+    numbered = "\n".join(f"{i + 1}. {name}" for i, name in enumerate(group_names))
+    return (
+        "Write a concise, engaging WhatsApp group description (strictly 30-60 characters) for each group below. "
+        "Focus on each group's main topic or benefit.\n"
+        "Respond with only a JSON object mapping each group's number (as a string) to its description, "
+        'for example {"1": "Daily tips for exam prep", "2": "..."}.\n\n'
+        f"Groups:\n{numbered}"
+    )
+
+def parse_batch_descriptions(response_text, group_names):
+    """Maps a batched JSON answer back to group names. Entries that are missing or empty are left out."""
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("{"):]
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        return {}
+    try:
+        answers = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    descriptions = {}
+    for i, name in enumerate(group_names):
+        answer = answers.get(str(i + 1))
+        if isinstance(answer, str) and answer.strip():
+            descriptions[name] = clean_ai_description(answer, name)
+    return descriptions
+
+# --- LLM Backends ---
+
+class LLMBackend:
+    """Text-generation interface behind group descriptions and article generation.
+
+    Subclasses only need generate_text; the task methods build prompts and parse
+    answers on top of it and raise on failure.
+    """
+
+    name = "LLM"
+    cacheable = True # Whether answers may go in the shared on-disk description cache
+    input_price_per_mtok = 0.0
+    output_price_per_mtok = 0.0
+
+    def generate_text(self, prompt):
+        raise NotImplementedError
+
+    def identity(self):
+        """Tells apart backends whose answers may differ, for job deduplication. Must not contain secrets."""
+        return self.name
+
+    def describe_group(self, group_name):
+        with METRICS.timed("llm_describe_group"):
+            return clean_ai_description(self.generate_text(build_description_prompt(group_name)), group_name)
+
+    def describe_groups(self, group_names):
+        """Returns {group_name: description} for the names the model answered in one batched call."""
+        with METRICS.timed("llm_describe_batch"):
+            return parse_batch_descriptions(self.generate_text(build_batch_description_prompt(group_names)), group_names)
+
+    def generate_article(self, prompt):
+        with METRICS.timed("llm_article"):
+            return self.generate_text(prompt)
+
+    def stream_text(self, prompt):
+        """Yields the answer in chunks as they are produced. Backends without streaming yield it whole."""
+        yield self.generate_text(prompt)
+
+    def stream_article(self, prompt):
+        return self.stream_text(prompt)
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google-generativeai."""
+
+    name = "Gemini"
+    input_price_per_mtok = GEMINI_INPUT_PRICE_PER_MTOK
+    output_price_per_mtok = GEMINI_OUTPUT_PRICE_PER_MTOK
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL_NAME):
+        import google.generativeai as genai # Slow to import; only needed once a key is entered
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        self.model_name = model_name
+        self._key_digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    def identity(self):
+        return f"{self.name}:{self.model_name}:{self._key_digest}"
+
+    def generate_text(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def stream_text(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+class FakeLLMError(RuntimeError):
+    pass
+
+class FakeLLMBackend(LLMBackend):
+    """Deterministic offline stand-in for benchmarking and testing without network or quota.
+
+    Answers are derived from a hash of the prompt. Latency is `latency` seconds plus up
+    to `jitter` seconds, and roughly `failure_rate` of calls raise FakeLLMError. The
+    same prompt always gets the same answer and the same failure decision on its
+    first try, whatever order calls arrive in.
+    """
+
+    name = "Local fake"
+    cacheable = False # Canned answers must never be served to a real backend from the disk cache
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.calls = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def identity(self):
+        return f"{self.name}:{self.latency}:{self.jitter}:{self.failure_rate}:{self.seed}"
+
+    def _rng(self, prompt):
+        with self._lock:
+            self.calls += 1
+            attempt = self._attempts.get(prompt, 0)
+            self._attempts[prompt] = attempt + 1
+        digest = hashlib.sha256(f"{self.seed}:{attempt}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def generate_text(self, prompt):
+        rng = self._rng(prompt)
+        if self.latency or self.jitter:
+            time.sleep(self.latency + rng.random() * self.jitter)
+        if rng.random() < self.failure_rate:
+            raise FakeLLMError("Simulated LLM failure")
+        return self._answer(prompt, rng)
+
+    def stream_text(self, prompt, chunk_chars=200):
+        """Streams the answer in chunks. A simulated failure may happen before or partway through."""
+        rng = self._rng(prompt)
+        if self.latency or self.jitter:
+            time.sleep(self.latency + rng.random() * self.jitter)
+        fails = rng.random() < self.failure_rate
+        text = self._answer(prompt, rng)
+        chunks = [text[start:start + chunk_chars] for start in range(0, len(text), chunk_chars)]
+        fail_at = rng.randrange(len(chunks) + 1) if fails else None
+        for i, chunk in enumerate(chunks):
+            if i == fail_at:
+                raise FakeLLMError("Simulated LLM failure mid-stream")
+            if i and self.latency:
+                time.sleep(self.latency / 20)
+            yield chunk
+        if fail_at == len(chunks):
+            raise FakeLLMError("Simulated LLM failure mid-stream")
+
+    def _answer(self, prompt, rng):
+        if "Respond with only a JSON object" in prompt:
+            names = re.findall(r"^(\d+)\. (.+)$", prompt.split("Groups:\n", 1)[-1], re.MULTILINE)
+            return json.dumps({number: self._fake_description(name, rng) for number, name in names})
+        single = re.search(r"for a group named '(.*)'\. Focus", prompt)
+        if single:
+            return self._fake_description(single.group(1), rng)
+        return self._fake_article(prompt, rng)
+
+    @staticmethod
+    def _fake_description(group_name, rng):
+        hooks = ["Daily chats and tips", "News and updates", "Friendly help and resources", "Meetups and discussion"]
+        return f"{rng.choice(hooks)} for {group_name[:30]} fans"
+
+    @staticmethod
+    def _fake_article(prompt, rng):
+        title = re.search(r"\*\*Article Title to Generate:\*\* (.+)", prompt)
+        sections = ["Introduction", "Top Groups", "What Is It", "Key Benefits", "Tips for Joining", "Common Pitfalls", "FAQs", "Conclusion"]
+        words = ["community", "members", "share", "updates", "learn", "together", "active", "verified", "group", "tips"]
+        parts = [f"<h1>{title.group(1).strip() if title else 'Generated Article'}</h1>"]
+        for section in sections:
+            parts.append(f"<h2>{section}</h2>")
+            if section == "Top Groups" and ARTICLE_TABLE_MARKER in prompt:
+                parts.append(ARTICLE_TABLE_MARKER)
+            parts.append("<p>" + " ".join(rng.choice(words) for _ in range(70)) + ".</p>")
+        return "\n".join(parts)
+
+def build_continuation_prompt(prompt, partial_text):
+    """Asks the model to pick up an interrupted article exactly where it stopped."""
+    return (
+        f"{prompt}\n\nThe article was already partly written; the text so far is below between the markers. "
+        "Continue it exactly where it stops. Output only the continuation, without repeating any of the existing text.\n"
+        f"<<<ARTICLE SO FAR>>>\n{partial_text}\n<<<END>>>"
+    )
+
+def stream_article(llm_backend, prompt, on_chunk=None):
+    """Streams an article from the backend and measures it.
+
+    Returns a dict with "text", "complete", "error", "time_to_first_token" and
+    "total_time" (seconds). When the stream fails partway, "text" keeps everything
+    received so far. `on_chunk(text_so_far)` is called after every chunk.
+    """
+    started = time.perf_counter()
+    stats = {"text": "", "complete": False, "error": None, "time_to_first_token": None, "total_time": None}
+    error_type = None
+    try:
+        for chunk in llm_backend.stream_article(prompt):
+            if stats["time_to_first_token"] is None:
+                stats["time_to_first_token"] = time.perf_counter() - started
+            stats["text"] += chunk
+            if on_chunk:
+                on_chunk(stats["text"])
+        stats["complete"] = True
+    except Exception as e:
+        stats["error"] = str(e)
+        error_type = type(e).__name__
+    stats["total_time"] = time.perf_counter() - started
+    METRICS.observe("llm_article", stats["total_time"], error_type)
+    if stats["time_to_first_token"] is not None:
+        METRICS.observe("llm_article_first_token", stats["time_to_first_token"])
+    return stats
+
+def get_ai_description_for_group(group_name, llm_backend):
+    """Generates a short description for a WhatsApp group using the configured LLM backend."""
     if not group_name or group_name == "Unnamed Group":
         return "A general community group."
-    if not genai_model:
-        st.warning("Gemini model not initialized for AI description generation.")
+    if not llm_backend:
+        st.warning("LLM backend not initialized for AI description generation.")
         return f"A community for {group_name} fans." 
     try:
-        prompt = f"Write a concise, engaging WhatsApp group description (strictly 30-60 characters) for a group named '{group_name}'. Focus on its main topic or benefit. Output only the description text, nothing else."
-        response = genai_model.generate_content(prompt)
-        desc_text = response.text.strip().replace("\n", " ")
-        if len(desc_text) > 70: 
-            desc_text = desc_text[:67] + "..."
-        return desc_text if desc_text else f"Explore the {group_name} community."
+        return llm_backend.describe_group(group_name)
     except Exception as e:
         st.warning(f"AI description generation failed for '{group_name}': {e}")
         return f"A community for {group_name} fans." 
 
+# --- Batched AI Descriptions ---
+
+class DescriptionCache:
+    """On-disk SQLite memo of AI descriptions keyed by group name."""
+
+    def __init__(self, path=DESCRIPTION_CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS group_description (group_name TEXT PRIMARY KEY, description TEXT, created_at REAL)")
+
+    def get_many(self, group_names):
+        """Returns {group_name: description} for the names that have been described before."""
+        found = {}
+        names = list(dict.fromkeys(group_names))
+        with self._lock:
+            for start in range(0, len(names), 500):
+                chunk = names[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT group_name, description FROM group_description WHERE group_name IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, descriptions):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO group_description VALUES (?, ?, ?)",
+                [(name, desc, now) for name, desc in descriptions.items()],
+            )
+
+@st.cache_resource(show_spinner=False)
+def get_description_cache():
+    """Returns the process-wide description cache."""
+    return DescriptionCache()
+
+def _describe_batch(group_names, llm_backend):
+    try:
+        return llm_backend.describe_groups(group_names)
+    except Exception:
+        return {}
+
+def _describe_single(group_name, llm_backend):
+    try:
+        return {group_name: llm_backend.describe_group(group_name)}
+    except Exception:
+        return {}
+
+def generate_ai_descriptions(group_names, llm_backend, cache=None, batch_size=DESCRIPTION_BATCH_SIZE,
+                             max_workers=DESCRIPTION_WORKERS, on_progress=None):
+    """Describes many groups with few model calls and returns {group_name: description}.
+
+    Cached names cost nothing. The rest are packed into batched prompts that run
+    concurrently. Any names a batch fails to answer are retried with individual calls,
+    and names that still fail get the same fallback text as get_ai_description_for_group.
+    Only model-written descriptions are cached, and backends that are not `cacheable`
+    get a throwaway in-memory cache instead of the shared one on disk.
+    `on_progress(done, total)` is called from the calling thread.
+    """
+    if cache is None:
+        cache = get_description_cache() if llm_backend is None or llm_backend.cacheable else DescriptionCache(":memory:")
+    names = [name for name in dict.fromkeys(group_names) if name]
+    descriptions = {name: "A general community group." for name in names if name == "Unnamed Group"}
+    pending = [name for name in names if name not in descriptions]
+    cached = cache.get_many(pending)
+    METRICS.count_cache("description", hits=len(cached), misses=len(pending) - len(cached))
+    descriptions.update(cached)
+    pending = [name for name in pending if name not in descriptions]
+    total = len(names)
+
+    def _report():
+        if on_progress:
+            on_progress(len(descriptions), total)
+
+    _report()
+    if not pending or not llm_backend:
+        descriptions.update({name: f"A community for {name} fans." for name in pending})
+        return descriptions
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)] if batch_size > 1 else []
+        futures = [executor.submit(_describe_batch, batch, llm_backend) for batch in batches]
+        for future in as_completed(futures):
+            answered = future.result()
+            cache.put_many(answered)
+            descriptions.update(answered)
+            _report()
+
+        leftovers = [name for name in pending if name not in descriptions]
+        futures = [executor.submit(_describe_single, name, llm_backend) for name in leftovers]
+        for future in as_completed(futures):
+            answered = future.result()
+            cache.put_many(answered)
+            descriptions.update(answered)
+            _report()
+
+    descriptions.update({name: f"A community for {name} fans." for name in pending if name not in descriptions})
+    return descriptions
+
+# --- WordPress Publisher ---
+
+class WordPressError(Exception):
+    """A WordPress REST call failed for good (after retries, or with a non-retryable status)."""
+
+    def __init__(self, status_code, details):
+        self.status_code = status_code
+        self.details = details
+        if isinstance(details, dict):
+            message = f"{status_code} - {details.get('code', 'N/A')}. Message: {details.get('message', 'No message.')}"
+        else:
+            message = f"{status_code} - {str(details)[:200]}"
+        super().__init__(message)
+
+class WordPressPublisher:
+    """Posts drafts through the WordPress REST API over one pooled keep-alive session.
+
+    429 and 5xx responses and connection errors are retried with exponential backoff.
+    A Retry-After header is honored when present, up to `max_wait` seconds; a longer
+    one fails the call with WordPressError instead of stalling it. Creating a draft first looks up its
+    slug, so re-posting an article that already exists returns the existing post
+    instead of creating a duplicate. At most `max_concurrency` requests are in flight.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, site_url, auth, max_concurrency=WP_MAX_CONCURRENCY, max_retries=3, backoff=1.0, timeout=30, max_wait=MAX_HOST_WAIT):
+        self.api_url = f"{site_url.rstrip('/')}/wp-json/wp/v2/posts"
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.session = requests.Session()
+        self.session.auth = auth
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._in_flight = threading.BoundedSemaphore(max_concurrency)
+        self._slug_locks = {}
+        self._slug_locks_lock = threading.Lock()
+
+    def _retry_delay(self, attempt, response):
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            if retry_after > self.max_wait:
+                raise WordPressError(response.status_code, f"Server asked us to retry after {retry_after:.0f} s")
+            return retry_after
+        return self.backoff * (2 ** attempt)
+
+    def _request(self, method, url, retries=None, **kwargs):
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            response = None
+            try:
+                with self._in_flight, METRICS.timed("wordpress_request") as probe:
+                    response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                    if response.status_code >= 400:
+                        probe["error"] = f"HTTP {response.status_code}"
+                if response.status_code not in self.RETRY_STATUSES:
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == retries:
+                    raise
+            if attempt < retries:
+                time.sleep(self._retry_delay(attempt, response))
+        return response
+
+    @staticmethod
+    def _error_details(response):
+        try:
+            return response.json()
+        except ValueError:
+            return response.text
+
+    def find_post_by_slug(self, slug):
+        """Returns the existing post with this slug in any status, or None."""
+        response = self._request("GET", self.api_url, params={"slug": slug, "status": "any", "context": "edit", "_fields": "id,link,status,slug"})
+        if response.status_code != 200:
+            raise WordPressError(response.status_code, self._error_details(response))
+        posts = response.json()
+        return posts[0] if posts else None
+
+    def create_draft(self, title, content, slug):
+        """Creates a draft unless a post with the slug exists.
+
+        Returns {"id", "link", "created"}, where "created" is False when an existing
+        post was reused.
+        """
+        with METRICS.timed("wordpress_post"):
+            return self._create_draft(title, content, slug)
+
+    def _create_draft(self, title, content, slug):
+        with self._slug_locks_lock:
+            slug_lock = self._slug_locks.setdefault(slug, threading.Lock())
+        with slug_lock:
+            existing = self.find_post_by_slug(slug)
+            if existing:
+                return {"id": existing.get("id"), "link": existing.get("link"), "created": False}
+            post_data = {
+                'title': title,
+                'content': content, 
+                'status': 'draft',
+                'slug': slug
+                # 'tags' key is intentionally omitted as per user request
+            }
+            for attempt in range(self.max_retries + 1):
+                # POST is not idempotent, so before retrying check whether the failed attempt created the post anyway.
+                if attempt:
+                    existing = self.find_post_by_slug(slug)
+                    if existing:
+                        return {"id": existing.get("id"), "link": existing.get("link"), "created": True}
+                try:
+                    response = self._request("POST", self.api_url, retries=0, json=post_data)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if attempt == self.max_retries:
+                        raise
+                    time.sleep(self._retry_delay(attempt, None))
+                    continue
+                if response.status_code == 201:
+                    post = response.json()
+                    return {"id": post.get("id"), "link": post.get("link"), "created": True}
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    raise WordPressError(response.status_code, self._error_details(response))
+                time.sleep(self._retry_delay(attempt, response))
+
+    def post_drafts(self, drafts):
+        """Posts many {"title", "content", "slug"} drafts concurrently, capped at max_concurrency.
+
+        Returns one result per draft, in input order, each with either the
+        create_draft fields or an "error".
+        """
+        def _post(draft):
+            try:
+                return {"slug": draft["slug"], **self.create_draft(draft["title"], draft["content"], draft["slug"])}
+            except Exception as e:
+                return {"slug": draft["slug"], "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(_post, drafts))
+
+    def close(self):
+        self.session.close()
+
+@st.cache_resource(show_spinner=False)
+def get_wordpress_publisher(site_url, username, app_password):
+    """Returns a publisher per site and account, so its keep-alive connections are reused across reruns."""
+    return WordPressPublisher(site_url, (username, app_password))
+
+# --- Background Jobs ---
+
+class JobQueue:
+    """Durable SQLite queue of background jobs, shared by every session (and process) using the same file.
+
+    Jobs are deduplicated by a hash of their kind and params: submitting work that is
+    already queued, running or recently done returns the existing job instead. Progress,
+    a partial result and the final result live on the job's row, so any session can
+    poll or collect it, including after its tab was closed or the server restarted.
+    """
+
+    COLUMNS = ("id", "kind", "params", "status", "attempts", "progress", "message", "partial", "result", "error",
+               "created_at", "started_at", "finished_at")
+
+    def __init__(self, path=JOBS_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, params TEXT, dedupe_key TEXT, status TEXT, attempts INTEGER, "
+                "progress REAL, message TEXT, partial TEXT, result TEXT, error TEXT, "
+                "created_at REAL, started_at REAL, finished_at REAL, heartbeat_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (dedupe_key, status)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at)")
+
+    @staticmethod
+    def dedupe_key(kind, params):
+        return hashlib.sha256(json.dumps([kind, params], sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def submit(self, kind, params, reuse_ttl=JOB_REUSE_TTL, fresh=False, now=None):
+        """Queues a job unless an identical one is queued, running or finished within `reuse_ttl` seconds.
+
+        A `reuse_ttl` of 0 only joins queued or running jobs; `fresh` always queues a new one.
+        Returns (job_id, created).
+        """
+        now = time.time() if now is None else now
+        key = self.dedupe_key(kind, params)
+        with self._lock, self._conn:
+            row = None if fresh else self._conn.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND (status IN ('queued', 'running') OR (status = 'done' AND finished_at > ?)) "
+                "ORDER BY created_at DESC LIMIT 1", (key, now - reuse_ttl if reuse_ttl > 0 else now + 1),
+            ).fetchone()
+            if row:
+                return row[0], False
+            job_id = os.urandom(8).hex()
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, dedupe_key, status, attempts, progress, message, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', 0, 0, 'Queued', ?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), key, now),
+            )
+        return job_id, True
+
+    def claim(self, kinds, now=None):
+        """Marks the oldest queued job of one of `kinds` running and returns it, or None if there is none."""
+        now = time.time() if now is None else now
+        kinds = list(kinds)
+        with self._lock:
+            while True:
+                with self._conn:
+                    row = self._conn.execute(
+                        f"SELECT id FROM jobs WHERE status = 'queued' AND kind IN ({','.join('?' * len(kinds))}) ORDER BY created_at LIMIT 1",
+                        kinds,
+                    ).fetchone()
+                    if row is None:
+                        return None
+                    # Another process may take the same row between the SELECT and this UPDATE.
+                    claimed = self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, heartbeat_at = ?, message = 'Starting' "
+                        "WHERE id = ? AND status = 'queued'", (now, now, row[0]),
+                    ).rowcount
+                if claimed:
+                    return self._get_locked(row[0])
+
+    def report(self, job_id, progress=None, message=None, partial=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message), "
+                "partial = COALESCE(?, partial), heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                (progress, message, None if partial is None else json.dumps(partial, ensure_ascii=False), now, job_id),
+            )
+
+    def heartbeat(self, job_ids, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'", [(now, job_id) for job_id in job_ids])
+
+    def finish(self, job_id, result, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, message = 'Done', partial = NULL, result = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), now, job_id),
+            )
+
+    def fail(self, job_id, error, now=None):
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = 'failed', message = 'Failed', error = ?, finished_at = ? WHERE id = ?", (error, now, job_id))
+
+    def requeue_stale(self, stale_after=JOB_STALE_AFTER, max_attempts=JOB_MAX_ATTEMPTS, now=None):
+        """Requeues running jobs whose worker stopped sending heartbeats (a crash or restart). Returns how many."""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', message = 'Failed', error = 'Worker stopped too many times', finished_at = ? "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?", (now, now - stale_after, max_attempts),
+            )
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'queued', message = 'Requeued after a worker stopped' WHERE status = 'running' AND heartbeat_at < ?",
+                (now - stale_after,),
+            ).rowcount
+
+    def purge(self, older_than=JOB_RETENTION, now=None):
+        """Deletes finished jobs older than `older_than` seconds and returns how many were removed."""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (now - older_than,)).rowcount
+
+    def _get_locked(self, job_id):
+        row = self._conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        for column in ("params", "partial", "result"):
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def get(self, job_id):
+        """Returns the job as a dict with its params, partial and result decoded, or None."""
+        with self._lock:
+            return self._get_locked(job_id)
+
+    def recent(self, limit=20):
+        """Summaries (no params or results) of the newest jobs."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, status, progress, message, error, created_at, finished_at FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,),
+            ).fetchall()
+        return [dict(zip(("id", "kind", "status", "progress", "message", "error", "created_at", "finished_at"), row)) for row in rows]
+
+class JobContext:
+    """Handed to a job handler to report progress and reach the job's in-memory resources."""
+
+    def __init__(self, queue, job_id, resources, min_interval=JOB_REPORT_INTERVAL):
+        self.queue = queue
+        self.job_id = job_id
+        self.resources = resources
+        self.min_interval = min_interval
+        self._reported_at = 0.0
+
+    def report(self, progress=None, message=None, partial=None, force=False):
+        """Stores progress (0-1), a status message and optionally a partial result. Throttled unless `force`."""
+        if not force and time.monotonic() - self._reported_at < self.min_interval:
+            return
+        self._reported_at = time.monotonic()
+        self.queue.report(self.job_id, progress, message, partial)
+
+    def resource(self, name):
+        if name not in self.resources:
+            raise RuntimeError(f"This job needs its {name}, which did not survive a server restart. Submit it again.")
+        return self.resources[name]
+
+class JobRunner:
+    """Worker threads that run JobQueue jobs with the handlers in `handlers` ({kind: handler(params, context)}).
+
+    Objects that cannot be stored, such as the LLM backend, are passed to submit() as
+    `resources` and kept in memory for the job. Handlers return a JSON-serializable result.
+    """
+
+    def __init__(self, queue, handlers, workers=JOB_WORKERS):
+        self.queue = queue
+        self.handlers = handlers
+        self._resources = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self.queue.requeue_stale()
+        self.queue.purge()
+        self._threads = [threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True) for n in range(workers)]
+        self._threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, kind, params, resources=None, fresh=False):
+        """Queues a job, or joins an identical one already queued or running. Returns its id.
+
+        Finished results are only reused for JOB_REUSABLE_KINDS, and never when `fresh` is set.
+        """
+        job_id, created = self.queue.submit(kind, params, reuse_ttl=JOB_REUSE_TTL if kind in JOB_REUSABLE_KINDS else 0, fresh=fresh)
+        if created and resources:
+            with self._lock:
+                self._resources[job_id] = resources
+        self._wakeup.set()
+        return job_id
+
+    def _work(self):
+        while not self._stopped.is_set():
+            job = self.queue.claim(self.handlers)
+            if job is None:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            with self._lock:
+                self._running.add(job["id"])
+                resources = self._resources.pop(job["id"], {})
+            context = JobContext(self.queue, job["id"], resources)
+            try:
+                with METRICS.timed(f"job_{job['kind']}"):
+                    result = self.handlers[job["kind"]](job["params"], context)
+            except Exception as e:
+                self.queue.fail(job["id"], f"{type(e).__name__}: {e}")
+            else:
+                self.queue.finish(job["id"], result)
+            finally:
+                with self._lock:
+                    self._running.discard(job["id"])
+
+    def _heartbeat(self):
+        while not self._stopped.wait(JOB_HEARTBEAT):
+            with self._lock:
+                running = list(self._running)
+            self.queue.heartbeat(running)
+            self.queue.requeue_stale()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+def scrape_progress(pages_done, page_count, links_validated, links_found):
+    """Pages cover the first half of the bar, validation of links found so far the second."""
+    page_fraction = pages_done / page_count if page_count else 0
+    validated_fraction = links_validated / links_found if links_found else 0
+    return 0.1 + 0.4 * page_fraction + 0.5 * page_fraction * validated_fraction
+
+def run_scrape_job(params, job):
+    """Search, scrape and validate, pipelined. Partial results carry the groups found so far."""
+    job.report(0.0, f"Fetching Google search results for: '{params['query']}'...", force=True)
+    page_urls = search_result_urls(params["query"], params["top_n"])
+    if not page_urls:
+        raise RuntimeError("No search results returned from Google.")
+    groups, warnings, page_timings = [], [], []
+    cache_stats = {"hits": 0, "misses": 0}
+    links_found = links_validated = pages_done = 0
+    logo_fetcher = LogoFetcher()
+    duplicates = DuplicateGroupFilter()
+    for event in iter_scrape_and_validate(page_urls, force_revalidate=params["force_revalidate"], stats=cache_stats, timings=page_timings):
+        if event[0] == "page":
+            _, i, url, error, new_link_count = event
+            pages_done = i + 1
+            links_found += new_link_count
+            if error is not None:
+                warnings.append(f"Error scraping {url[:50]}: {type(error).__name__}. Skipping.")
+        else:
+            links_validated += 1
+            if is_listable_group(event[1]) and duplicates.accept(event[1]):
+                groups.append(event[1])
+                logo_fetcher.submit(event[1])
+        job.report(scrape_progress(pages_done, len(page_urls), links_validated, links_found),
+                   f"Scraped {pages_done}/{len(page_urls)} pages, validated {links_validated}/{links_found} links", partial={"groups": groups})
+    job.report(1.0, "Caching group logos...", partial={"groups": groups}, force=True)
+    logo_fetcher.wait()
+    return {"groups": groups, "links_found": links_found, "duplicates": duplicates.dropped, "cache_stats": cache_stats,
+            "page_timings": page_timings, "warnings": warnings}
+
+def run_refresh_job(params, job):
+    return refresh_groups(params["groups"], on_result=lambda done, total: job.report(done / total, f"Revalidated {done}/{total} links"))
+
+def run_describe_job(params, job):
+    return generate_ai_descriptions(
+        params["names"], job.resource("llm_backend"), batch_size=params["batch_size"],
+        on_progress=lambda done, total: job.report(done / total if total else 1.0, f"Described {done}/{total} groups..."),
+    )
+
+def run_article_job(params, job):
+    llm_backend = job.resource("llm_backend")
+    job.report(0.0, f"{llm_backend.name} is writing the article...", force=True)
+    if params["stream"]:
+        generation = stream_article(llm_backend, params["prompt"], on_chunk=lambda text: job.report(None, f"{len(text)} characters written", partial={"text": text}))
+    else:
+        started = time.perf_counter()
+        text = llm_backend.generate_article(params["prompt"])
+        elapsed = time.perf_counter() - started
+        generation = {"text": text, "complete": True, "error": None, "time_to_first_token": elapsed, "total_time": elapsed}
+    if not generation["text"] and generation["error"]:
+        raise RuntimeError(generation["error"])
+    generation["article"] = stitch_article_table(generation["text"], params["table_html"], generation["complete"])
+    return generation
+
+JOB_HANDLERS = {"scrape": run_scrape_job, "refresh": run_refresh_job, "describe": run_describe_job, "article": run_article_job}
+
+@st.cache_resource(show_spinner=False)
+def get_job_runner():
+    """Returns the process-wide job runner. Jobs left queued or running by a previous server process resume here."""
+    return JobRunner(JobQueue(), JOB_HANDLERS)
+
 # --- Main App ---
+def configure_page():
+    """Applies page config and CSS. Kept out of import time so the helpers can be used headlessly."""
+    st.set_page_config(page_title="WhatsApp Content Generator", layout="wide", initial_sidebar_state="expanded")
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
+
+def set_generated_article(text):
+    """Stores new article text and pushes it into the step-4 editor, whose keyed state would otherwise keep the old text."""
+    st.session_state.generated_article_content = text
+    st.session_state.article_review_and_edit_area = text
+
+JOB_LABELS = {"scrape": "Search & scrape", "refresh": "Refresh", "describe": "AI descriptions", "article": "Article generation"}
+
+def save_last_groups(group_store):
+    try:
+        group_store.save(LAST_GROUPS_PATH)
+    except OSError:
+        pass
+
+def attach_job(kind, job_id):
+    """Follows a background job from this session and records it in the URL, so a reopened tab reconnects to it."""
+    st.session_state.jobs[kind] = job_id
+    st.query_params["jobs"] = ",".join(f"{k}:{v}" for k, v in st.session_state.jobs.items())
+
+def detach_job(kind):
+    st.session_state.jobs.pop(kind, None)
+    if st.session_state.jobs:
+        st.query_params["jobs"] = ",".join(f"{k}:{v}" for k, v in st.session_state.jobs.items())
+    else:
+        st.query_params.pop("jobs", None)
+
+def apply_job_result(kind, job):
+    """Takes a finished job's result into this session, the way the synchronous path would have."""
+    result, params = job["result"], job["params"]
+    if kind == "scrape":
+        st.session_state.group_store = GroupStore(result["groups"])
+        st.session_state.selected_group_links = []
+        st.session_state.generated_article_content = None
+        st.session_state.page_timings = result["page_timings"]
+        st.session_state.validation_cache_stats = result["cache_stats"]
+        save_last_groups(st.session_state.group_store)
+        return (f"Scraping complete! Found {len(result['groups'])} active and named groups, {result.get('duplicates', 0)} duplicates merged "
+                f"(link cache: {result['cache_stats']['hits']} hits, {result['cache_stats']['misses']} misses).")
+    if kind == "refresh":
+        if params["source"] == "Current groups":
+            refreshed_store = st.session_state.group_store
+        else:
+            refreshed_store = GroupStore(params["groups"])
+            st.session_state.selected_group_links = []
+        refreshed_store.apply_refresh(result)
+        st.session_state.group_store = refreshed_store
+        save_last_groups(refreshed_store)
+        st.session_state.refresh_diff = result
+        return f"Refresh complete: {len(result['active']) + len(result['renamed'])} active, {len(result['expired'])} expired."
+    if kind == "describe":
+        group_store = st.session_state.group_store
+        for group_name, description in result.items():
+            for record in group_store.by_name(group_name):
+                if not record.description.strip():
+                    group_store.update_description(record.link, description)
+        return "AI descriptions generated for selected groups!"
+    result["prompt"] = params["prompt_stats"]
+    st.session_state.article_prompt = params["prompt"]
+    st.session_state.article_table_html = params["table_html"]
+    st.session_state.article_generation_stats = result
+    set_generated_article(result["article"] or None)
+    return "Article content generated successfully!" if result["complete"] else f"Generation stopped early ({result['error']}); the partial article was kept."
+
+def collect_finished_jobs():
+    """Applies the results of this session's finished background jobs, once each."""
+    queue = get_job_runner().queue
+    for kind, job_id in list(st.session_state.jobs.items()):
+        job = queue.get(job_id)
+        if job is not None and job["status"] in ("queued", "running"):
+            continue
+        detach_job(kind)
+        if job is None:
+            continue
+        if job["status"] == "failed":
+            st.toast(f"{JOB_LABELS[kind]} failed: {job['error']}", icon="⚠️")
+        else:
+            st.toast(apply_job_result(kind, job), icon="✅")
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def render_job_progress(kind):
+    """Polls one followed job. Once it finishes, the whole app reruns so collect_finished_jobs applies it."""
+    job_id = st.session_state.jobs.get(kind)
+    job = get_job_runner().queue.get(job_id) if job_id else None
+    if job is None or job["status"] not in ("queued", "running"):
+        st.rerun()
+    st.progress(min(job["progress"] or 0.0, 1.0), text=f"{job['message']} (background job {job_id[:8]}; safe to close this tab)")
+    partial = job["partial"] or {}
+    if kind == "scrape" and partial.get("groups"):
+        st.markdown(generate_html_table_for_display(partial["groups"]), unsafe_allow_html=True)
+    elif kind == "article" and partial.get("text"):
+        st.markdown(partial["text"] + " ▌")
+
+def render_jobs_panel():
+    """Sidebar list of recent background jobs from every session, with a way to follow one from this tab."""
+    with st.sidebar.expander("🧵 Background jobs", expanded=False):
+        jobs = get_job_runner().queue.recent()
+        if not jobs:
+            st.caption("No background jobs yet.")
+            return
+        st.dataframe([
+            {"Job": job["id"][:8], "Kind": JOB_LABELS.get(job["kind"], job["kind"]), "Status": job["status"],
+             "Progress": f"{(job['progress'] or 0):.0%}", "Started": time.strftime("%H:%M:%S", time.localtime(job["created_at"])),
+             "Note": job["error"] or job["message"]}
+            for job in jobs
+        ], use_container_width=True, hide_index=True)
+        followable = [job for job in jobs if job["status"] != "failed" and st.session_state.jobs.get(job["kind"]) != job["id"]]
+        if followable:
+            choice = st.selectbox("Job", followable, format_func=lambda job: f"{job['id'][:8]} {JOB_LABELS.get(job['kind'], job['kind'])} ({job['status']})",
+                                  key="follow_job_choice")
+            if st.button("Follow / load results", use_container_width=True, type="secondary",
+                         help="Show this job's progress here and load its results into this session when it finishes."):
+                attach_job(choice["kind"], choice["id"])
+                st.rerun()
+
+def render_performance_panel():
+    """Sidebar summary of METRICS: per-stage latency, bytes and errors, cache hit rates, and a JSON export."""
+    with st.sidebar.expander("📊 Performance", expanded=False):
+        snapshot = METRICS.snapshot()
+        snapshot["hosts"] = SCHEDULER.snapshot()
+        if not snapshot["stages"] and not snapshot["caches"] and not snapshot["hosts"]:
+            st.caption("No activity recorded yet.")
+            return
+        st.caption(f"Since {time.strftime('%H:%M:%S', time.localtime(snapshot['started_at']))}, shared by all sessions of this server.")
+        if snapshot["stages"]:
+            st.dataframe([
+                {"Stage": stage, "Calls": stats["calls"], "Errors": stats["errors"], "p50 (ms)": stats["p50_ms"],
+                 "p95 (ms)": stats["p95_ms"], "Max (ms)": stats["max_ms"], "KiB": round(stats["bytes"] / 1024, 1)}
+                for stage, stats in snapshot["stages"].items()
+            ], use_container_width=True, hide_index=True)
+            errors = [f"{stage}: " + ", ".join(f"{error_type} × {count}" for error_type, count in stats["errors_by_type"].items())
+                      for stage, stats in snapshot["stages"].items() if stats["errors"]]
+            if errors:
+                st.caption("Errors by type — " + "; ".join(errors))
+            histogram_stage = st.selectbox("Latency histogram", list(snapshot["stages"]), key="performance_histogram_stage")
+            st.dataframe([{"Latency": bucket, "Calls": count} for bucket, count in snapshot["stages"][histogram_stage]["histogram"].items()],
+                         use_container_width=True, hide_index=True)
+        if snapshot["caches"]:
+            st.dataframe([
+                {"Cache": cache_name, "Hits": counts["hits"], "Misses": counts["misses"],
+                 "Hit rate": f"{counts['hit_rate']:.0%}" if counts["hit_rate"] is not None else "-"}
+                for cache_name, counts in snapshot["caches"].items()
+            ], use_container_width=True, hide_index=True)
+        snapshot["page_cache"] = get_page_cache().stats()
+        page_cache_stats = snapshot["page_cache"]
+        if page_cache_stats["revalidated"] or page_cache_stats["fetched"]:
+            st.caption(f"Result-page cache: {page_cache_stats['pages']} pages ({page_cache_stats['stored_bytes'] / 1024:.0f} KiB compressed), "
+                       f"{page_cache_stats['revalidated']} unchanged (304) vs {page_cache_stats['fetched']} downloaded, "
+                       f"{page_cache_stats['bytes_saved'] / 1024:.0f} KiB saved.")
+        if snapshot["hosts"]:
+            st.caption("Host limits (adaptive concurrency and circuit breakers)")
+            st.dataframe([
+                {"Host": host["host"], "Limit": host["limit"], "In flight": host["in_flight"], "Circuit": host["circuit"],
+                 "Latency (ms)": host["latency_ms"], "Timeout (s)": host["timeout_s"], "Failures": host["failures"],
+                 "Paused (s)": host["paused_s"] or None}
+                for host in snapshot["hosts"]
+            ], use_container_width=True, hide_index=True)
+        if USER_AGENTS.error:
+            st.caption(f"fake-useragent unavailable ({USER_AGENTS.error}); requests use the default User-Agent.")
+        st.download_button("Export metrics (JSON)", data=json.dumps(snapshot, indent=2), file_name="performance_metrics.json",
+                           mime="application/json", use_container_width=True)
+        if st.button("Reset metrics", use_container_width=True, type="secondary"):
+            METRICS.reset()
+            st.rerun()
+        if snapshot["hosts"] and st.button("Reset host limits", use_container_width=True, type="secondary",
+                                          help="Forget learned limits and close every circuit breaker."):
+            SCHEDULER.reset()
+            st.rerun()
+
 def main():
+    configure_page()
     st.markdown('<h1 class="main-title">WhatsApp Content Generator</h1>', unsafe_allow_html=True)
     st.markdown('<p class="subtitle">Search, Scrape, Generate AI Content, and Post to WordPress</p>', unsafe_allow_html=True)
 
     # Initialize Session State
-    if 'all_scraped_groups' not in st.session_state: 
-        st.session_state.all_scraped_groups = []
-    if 'selected_group_names' not in st.session_state: 
-        st.session_state.selected_group_names = []
+    if 'group_store' not in st.session_state: 
+        st.session_state.group_store = GroupStore()
+    if 'selected_group_links' not in st.session_state: 
+        st.session_state.selected_group_links = []
     if 'generated_article_content' not in st.session_state:
         st.session_state.generated_article_content = None
-    if 'gemini_model' not in st.session_state:
-        st.session_state.gemini_model = None
+    if 'llm_backend' not in st.session_state:
+        st.session_state.llm_backend = None
+    if 'llm_backend_config' not in st.session_state:
+        st.session_state.llm_backend_config = None
     if 'post_title_template' not in st.session_state: # Persist template
         st.session_state.post_title_template = "Top {target_keyword} WhatsApp Groups [Current Year]"
     if 'target_keyword' not in st.session_state:
@@ -311,40 +2972,94 @@ def main():
         st.session_state.lsi_keywords = "student community, exam preparation, online learning"
     if 'local_keywords' not in st.session_state:
         st.session_state.local_keywords = ""
+    if 'validation_cache_stats' not in st.session_state:
+        st.session_state.validation_cache_stats = None
+    if 'page_timings' not in st.session_state:
+        st.session_state.page_timings = []
+    if 'article_prompt' not in st.session_state:
+        st.session_state.article_prompt = None
+    if 'article_generation_stats' not in st.session_state:
+        st.session_state.article_generation_stats = None
+    if 'article_table_html' not in st.session_state:
+        st.session_state.article_table_html = None
+    if 'refresh_diff' not in st.session_state:
+        st.session_state.refresh_diff = None
+    if 'jobs' not in st.session_state: # Background jobs this session follows, by kind; restored from the URL on reconnect
+        st.session_state.jobs = {kind: job_id for kind, _, job_id in (entry.partition(":") for entry in st.query_params.get("jobs", "").split(","))
+                                 if kind in JOB_LABELS and job_id}
+    collect_finished_jobs()
 
 
     # Sidebar for Inputs
     with st.sidebar:
         st.header("⚙️ Configuration")
-        gemini_api_key = st.text_input("Gemini API Key", type="password", help="Enter your Gemini API key from Google AI Studio.")
+        llm_choice = st.selectbox("LLM Backend", ["Gemini", "Local fake (offline)"], help="The local fake needs no network or API key and is meant for testing and timing runs.")
+        if llm_choice == "Gemini":
+            gemini_api_key = st.text_input("Gemini API Key", type="password", help="Enter your Gemini API key from Google AI Studio.")
+            llm_config = ("Gemini", gemini_api_key) if gemini_api_key else None
+        else:
+            fake_latency = st.slider("Fake latency (s)", 0.0, 5.0, 0.5, 0.1)
+            fake_failure_rate = st.slider("Fake failure rate", 0.0, 1.0, 0.0, 0.05)
+            llm_config = ("Fake", fake_latency, fake_failure_rate)
+        background_jobs = st.checkbox("Run long steps as background jobs", value=True,
+                                      help="Scraping, refreshes, descriptions and articles run in a shared worker pool: they survive reruns and closed tabs, "
+                                           "and identical work still running from another tab is joined instead of repeated. A search finished in the last "
+                                           "10 minutes is reused unless Force revalidate is on. Scraping always runs pipelined.")
         
         st.header("🔍 Search Settings")
         search_query = st.text_input("Google Search Query", "active study WhatsApp group links", help="e.g., 'best crypto news whatsapp groups'")
         top_n = st.slider("Google Results to Scrape", 1, 15, 5, help="Number of Google search results to analyze. Higher numbers take longer and risk rate limits.")
+        pipelined_scrape = st.checkbox("Validate links while scraping", value=True, help="Start validating each link as soon as its result page is scraped instead of waiting for every page.")
+        force_revalidate = st.checkbox("Force revalidate (ignore link cache)", value=False, help="Re-check every link over the network even if a fresh cached result exists.")
+        if st.session_state.validation_cache_stats:
+            cache_stats = st.session_state.validation_cache_stats
+            st.caption(f"Link cache (last run): {cache_stats['hits']} hits, {cache_stats['misses']} misses")
 
         st.header("📝 Content Settings")
         st.session_state.target_keyword = st.text_input("Target Keyword", value=st.session_state.target_keyword, help="Primary keyword for SEO content.")
         st.session_state.lsi_keywords = st.text_input("LSI Keywords (comma-separated)", value=st.session_state.lsi_keywords, help="Related keywords.")
         st.session_state.local_keywords = st.text_input("Local SEO Keywords (optional)", value=st.session_state.local_keywords, help="e.g., 'New York study groups'")
+        batch_descriptions = st.checkbox("Batch AI descriptions", value=True, help="Describe many groups per LLM call. Turn off to use one call per group. Descriptions are cached by group name either way.")
+        stream_article_output = st.checkbox("Stream article generation", value=True, help="Show the article as it is written and keep the partial text if generation fails.")
+        article_token_budget = st.number_input("Article prompt budget (tokens)", min_value=1000, max_value=100000, value=ARTICLE_PROMPT_TOKEN_BUDGET, step=500,
+                                               help="Estimated prompt size cap. Groups beyond it are left out of the prompt but still appear in the inserted table.")
         st.session_state.post_title_template = st.text_input("Post Title Template", value=st.session_state.post_title_template, help="Use placeholders like {target_keyword} and [Current Year].")
 
+        if not st.session_state.group_store and os.path.exists(LAST_GROUPS_PATH):
+            if st.button("Restore Last Scrape Results", use_container_width=True, type="secondary"):
+                try:
+                    st.session_state.group_store = GroupStore.load(LAST_GROUPS_PATH)
+                    st.rerun()
+                except (OSError, ValueError) as e:
+                    st.error(f"Could not restore the last scrape: {e}")
+
         if st.button("Clear All Data & Selections", use_container_width=True, type="secondary"):
-            st.session_state.all_scraped_groups = []
-            st.session_state.selected_group_names = []
+            st.session_state.group_store = GroupStore()
+            st.session_state.selected_group_links = []
             st.session_state.generated_article_content = None
+            st.session_state.page_timings = []
+            st.session_state.article_prompt = None
+            st.session_state.article_generation_stats = None
+            st.session_state.article_table_html = None
+            st.session_state.refresh_diff = None
+            for kind in list(st.session_state.jobs):
+                detach_job(kind) # The jobs keep running and stay listed under Background jobs
             # Keep API key and model if already configured
             st.success("Scraped groups, selections, and generated content cleared!")
             st.rerun()
 
 
-    if gemini_api_key and not st.session_state.gemini_model:
-        try:
-            genai.configure(api_key=gemini_api_key)
-            st.session_state.gemini_model = genai.GenerativeModel('gemini-1.5-flash-latest') 
-            st.sidebar.success("Gemini API configured.")
-        except Exception as e:
-            st.sidebar.error(f"Gemini configuration failed: {e}")
-            st.session_state.gemini_model = None
+    if llm_config != st.session_state.llm_backend_config:
+        st.session_state.llm_backend_config = llm_config
+        st.session_state.llm_backend = None
+        if llm_config and llm_config[0] == "Gemini":
+            try:
+                st.session_state.llm_backend = GeminiBackend(llm_config[1])
+                st.sidebar.success("Gemini API configured.")
+            except Exception as e:
+                st.sidebar.error(f"Gemini configuration failed: {e}")
+        elif llm_config:
+            st.session_state.llm_backend = FakeLLMBackend(latency=llm_config[1], jitter=llm_config[1] / 2, failure_rate=llm_config[2])
 
 
     wp_configured = False
@@ -367,123 +3082,294 @@ def main():
     if st.button("Start Search & Scrape", use_container_width=True, disabled=not search_query):
         if not search_query: 
             st.error("Please enter a search query.")
+        elif background_jobs:
+            attach_job("scrape", get_job_runner().submit("scrape", {"query": search_query, "top_n": top_n, "force_revalidate": force_revalidate},
+                                                         fresh=force_revalidate))
         else:
-            st.session_state.all_scraped_groups = [] 
-            st.session_state.selected_group_names = [] 
+            st.session_state.group_store = GroupStore() 
+            st.session_state.selected_group_links = [] 
             st.session_state.generated_article_content = None 
 
             progress_bar = st.progress(0, text="Initializing scrape...")
             status_text = st.empty()
             
-            scraped_links = scrape_google(search_query, top_n, progress_bar, status_text)
-            
             valid_groups_found = []
-            if scraped_links:
-                status_text.text(f"Validating {len(scraped_links)} unique links found...")
-                with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                    future_to_link = {executor.submit(validate_link, link): link for link in scraped_links}
-                    for i, future in enumerate(as_completed(future_to_link)):
-                        try:
-                            result = future.result()
-                            if result["Status"] == "Active" and result["Group Name"] != "Unnamed Group":
+            duplicates = DuplicateGroupFilter()
+            cache_stats = {"hits": 0, "misses": 0}
+            page_timings = []
+            live_table = st.empty()
+            live_table_drawn_at = 0.0
+            logo_fetcher = LogoFetcher()
+
+            def refresh_live_table():
+                nonlocal live_table_drawn_at
+                if time.monotonic() - live_table_drawn_at >= LIVE_TABLE_REFRESH:
+                    live_table.markdown(generate_html_table_for_display(valid_groups_found), unsafe_allow_html=True)
+                    live_table_drawn_at = time.monotonic()
+
+            if pipelined_scrape:
+                search_results = google_search_urls(search_query, top_n, status_text)
+                links_found = 0
+                links_validated = 0
+                pages_done = 0
+                progress_value = 0.1
+                if search_results:
+                    progress_bar.progress(progress_value)
+                    try:
+                        for event in iter_scrape_and_validate(search_results, force_revalidate=force_revalidate, stats=cache_stats, timings=page_timings):
+                            if event[0] == "page":
+                                _, i, url, error, new_link_count = event
+                                pages_done = i + 1
+                                links_found += new_link_count
+                                if error is not None:
+                                    st.warning(f"Error scraping {url[:50]}: {type(error).__name__}. Skipping.")
+                            else:
+                                result = event[1]
+                                links_validated += 1
+                                if is_listable_group(result) and duplicates.accept(result):
+                                    valid_groups_found.append(result)
+                                    logo_fetcher.submit(result)
+                                    refresh_live_table()
+                            progress_value = max(progress_value, scrape_progress(pages_done, len(search_results), links_validated, links_found))
+                            progress_bar.progress(min(progress_value, 1.0),
+                                                  text=f"Scraped {pages_done}/{len(search_results)} pages, validated {links_validated}/{links_found} links")
+                    except Exception as exc:
+                        status_text.warning(f"Error processing link validation: {exc}")
+                scraped_links = links_found
+            else:
+                scraped_links = scrape_google(search_query, top_n, progress_bar, status_text, timings=page_timings)
+                if scraped_links:
+                    status_text.text(f"Validating {len(scraped_links)} unique links found...")
+                    try:
+                        for i, result in enumerate(iter_validated_links_cached(scraped_links, force_revalidate=force_revalidate, stats=cache_stats)):
+                            if is_listable_group(result) and duplicates.accept(result):
                                 valid_groups_found.append(result)
-                        except Exception as exc:
-                            status_text.warning(f"Error processing link validation: {exc}")
-                        progress_bar.progress(0.5 + (i + 1) / len(scraped_links) * 0.5, 
-                                              text=f"Validating link {i+1}/{len(scraped_links)}")
-                
-                st.session_state.all_scraped_groups = valid_groups_found
-                status_text.success(f"Scraping complete! Found {len(valid_groups_found)} active and named groups.")
+                                logo_fetcher.submit(result)
+                                refresh_live_table()
+                            progress_bar.progress(0.5 + (i + 1) / len(scraped_links) * 0.5, 
+                                                  text=f"Validating link {i+1}/{len(scraped_links)}")
+                    except Exception as exc:
+                        status_text.warning(f"Error processing link validation: {exc}")
+            if valid_groups_found:
+                status_text.text("Caching group logos...")
+            logo_fetcher.wait()
+            live_table.empty()
+            st.session_state.page_timings = page_timings
+
+            if scraped_links:
+                st.session_state.group_store = GroupStore(valid_groups_found)
+                save_last_groups(st.session_state.group_store)
+                st.session_state.validation_cache_stats = cache_stats
+                status_text.success(f"Scraping complete! Found {len(valid_groups_found)} active and named groups, {duplicates.dropped} duplicates merged "
+                                    f"(link cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses).")
             else:
                 status_text.error("No WhatsApp group links found from Google search.")
             progress_bar.empty() 
+    if "scrape" in st.session_state.jobs:
+        render_job_progress("scrape")
+    if st.session_state.page_timings:
+        with st.expander("Result page timings"):
+            st.dataframe(st.session_state.page_timings, use_container_width=True)
+
+    with st.expander("🔄 Refresh existing groups (revalidate only, no search)", expanded=bool(st.session_state.refresh_diff)):
+        refresh_source = st.radio("Groups to refresh", ["Current groups", "Groups in an article's table"], horizontal=True, key="refresh_source")
+        if refresh_source == "Current groups":
+            st.caption(f"{len(st.session_state.group_store)} groups loaded. Links checked longest ago go first.")
+        else:
+            st.text_area("Article HTML", value=st.session_state.generated_article_content or "", height=150, key="refresh_article_html",
+                         help="Paste a published article; every invite link in its table is revalidated.")
+        if st.button("Revalidate Links", use_container_width=True):
+            if refresh_source == "Current groups":
+                groups_to_refresh = list(st.session_state.group_store)
+            else:
+                groups_to_refresh = parse_article_groups(st.session_state.refresh_article_html or "")
+            if not groups_to_refresh:
+                st.error("No WhatsApp invite links to refresh.")
+            elif background_jobs:
+                job_groups = [{field: group.get(field, "") for field in GroupRecord.FIELDS} for group in groups_to_refresh]
+                attach_job("refresh", get_job_runner().submit("refresh", {"groups": job_groups, "source": refresh_source}))
+            else:
+                refresh_progress = st.progress(0, text=f"Revalidating {len(groups_to_refresh)} links...")
+                diff = refresh_groups(groups_to_refresh, on_result=lambda done, total: refresh_progress.progress(done / total, text=f"Revalidated {done}/{total} links"))
+                refresh_progress.empty()
+                if refresh_source == "Current groups":
+                    refreshed_store = st.session_state.group_store
+                else:
+                    refreshed_store = GroupStore(groups_to_refresh)
+                    st.session_state.selected_group_links = []
+                refreshed_store.apply_refresh(diff)
+                st.session_state.group_store = refreshed_store
+                save_last_groups(refreshed_store)
+                st.session_state.refresh_diff = diff
+        if "refresh" in st.session_state.jobs:
+            render_job_progress("refresh")
+        diff = st.session_state.refresh_diff
+        if diff:
+            st.success(f"Last refresh: {len(diff['active'])} still active, {len(diff['renamed'])} renamed, "
+                       f"{len(diff['expired'])} newly expired (removed), {len(diff['unreachable'])} unreachable (kept).")
+            if diff["renamed"]:
+                st.caption("Renamed")
+                st.dataframe([{"Old name": entry["old_name"], "New name": entry["new_name"], "Link": entry["link"]} for entry in diff["renamed"]],
+                             use_container_width=True, hide_index=True)
+            if diff["expired"]:
+                st.caption("Newly expired")
+                st.dataframe([{"Group": entry["old_name"], "Link": entry["link"]} for entry in diff["expired"]], use_container_width=True, hide_index=True)
+            if diff["unreachable"]:
+                st.caption("Unreachable this time")
+                st.dataframe([{"Group": entry["old_name"], "Status": entry["status"], "Link": entry["link"]} for entry in diff["unreachable"]],
+                             use_container_width=True, hide_index=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 
-    if st.session_state.all_scraped_groups:
+    if st.session_state.group_store:
         st.markdown('<div class="section">', unsafe_allow_html=True)
         st.subheader("2. Review & Select Groups for Article")
 
-        current_group_names_available = [g["Group Name"] for g in st.session_state.all_scraped_groups]
+        group_store = st.session_state.group_store
+        current_group_links_available = group_store.links()
         
         # Preserve selection if possible, otherwise default to all
-        valid_previous_selections = [name for name in st.session_state.selected_group_names if name in current_group_names_available]
-        if not valid_previous_selections and current_group_names_available:
-            default_selection = current_group_names_available
+        valid_previous_selections = [link for link in st.session_state.selected_group_links if group_store.get(link) is not None]
+        if not valid_previous_selections and current_group_links_available:
+            default_selection = current_group_links_available
         else:
             default_selection = valid_previous_selections
 
-        selected_names_from_ui = st.multiselect(
+        selected_links_from_ui = st.multiselect(
             "Select groups to include in the article:",
-            options=current_group_names_available,
+            options=current_group_links_available,
             default=default_selection,
+            format_func=group_store.label,
             key="group_multiselect", # Added key for better state handling
             help="Choose which scraped groups will be featured."
         )
-        st.session_state.selected_group_names = selected_names_from_ui
-
-        selected_group_dicts = [
-            g for g in st.session_state.all_scraped_groups if g["Group Name"] in st.session_state.selected_group_names
-        ]
-
-        if selected_group_dicts:
-            if st.button("🤖 Generate AI Descriptions for Selected Groups", use_container_width=True, disabled=not st.session_state.gemini_model):
-                if not st.session_state.gemini_model:
-                    st.error("Gemini API key not configured. Please set it in the sidebar.")
+        st.session_state.selected_group_links = selected_links_from_ui
+
+        selected_groups = [group_store.get(link) for link in st.session_state.selected_group_links]
+
+        if selected_groups:
+            if st.button("🤖 Generate AI Descriptions for Selected Groups", use_container_width=True, disabled=not st.session_state.llm_backend):
+                if not st.session_state.llm_backend:
+                    st.error("LLM backend not configured. Enter a Gemini API key or choose the local fake in the sidebar.")
+                elif background_jobs:
+                    names_to_describe = [g["Group Name"] for g in selected_groups if not g.get("Description", "").strip()]
+                    attach_job("describe", get_job_runner().submit(
+                        "describe", {"names": names_to_describe, "batch_size": DESCRIPTION_BATCH_SIZE if batch_descriptions else 1,
+                                     "backend": st.session_state.llm_backend.identity()},
+                        resources={"llm_backend": st.session_state.llm_backend}))
                 else:
                     desc_progress = st.progress(0, text="Generating AI descriptions...")
+                    names_to_describe = [g["Group Name"] for g in selected_groups if not g.get("Description", "").strip()]
                     with st.spinner("AI is crafting short descriptions for selected groups..."):
-                        for i, group_dict_selected in enumerate(selected_group_dicts): # Iterate over copies in selected_group_dicts
-                            # Find the original dict in all_scraped_groups to update it
-                            for original_group_dict in st.session_state.all_scraped_groups:
-                                if original_group_dict["Group Name"] == group_dict_selected["Group Name"]:
-                                    if not original_group_dict.get("Description", "").strip():
-                                        ai_desc = get_ai_description_for_group(original_group_dict["Group Name"], st.session_state.gemini_model)
-                                        original_group_dict["Description"] = ai_desc
-                                    break # Found and updated original
-                            desc_progress.progress((i + 1) / len(selected_group_dicts), text=f"Describing: {group_dict_selected['Group Name'][:30]}...")
+                        descriptions = generate_ai_descriptions(
+                            names_to_describe, st.session_state.llm_backend,
+                            batch_size=DESCRIPTION_BATCH_SIZE if batch_descriptions else 1,
+                            on_progress=lambda done, total: desc_progress.progress(done / total if total else 1.0, text=f"Described {done}/{total} groups..."),
+                        )
+                        for record in selected_groups:
+                            if not record.description.strip() and record.group_name in descriptions:
+                                group_store.update_description(record.link, descriptions[record.group_name])
                     desc_progress.empty()
                     st.success("AI descriptions generated (or confirmed existing) for selected groups!")
                     st.rerun() # Rerun to show updated descriptions in the table
-
-        st.markdown(generate_html_table_for_display(selected_group_dicts), unsafe_allow_html=True)
+        if "describe" in st.session_state.jobs:
+            render_job_progress("describe")
+
+        table_groups = selected_groups
+        if len(selected_groups) > TABLE_PAGE_SIZE:
+            table_page = st.number_input("Table page", min_value=1, value=1, step=1, key="groups_table_page")
+            table_groups, page_count = paginate_groups(selected_groups, int(table_page))
+            first_row = (min(int(table_page), page_count) - 1) * TABLE_PAGE_SIZE
+            st.caption(f"Showing groups {first_row + 1}-{first_row + len(table_groups)} of {len(selected_groups)} (page {min(int(table_page), page_count)} of {page_count}).")
+        st.markdown(generate_html_table_for_display(table_groups), unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
 
         st.markdown('<div class="section">', unsafe_allow_html=True)
         st.subheader("3. Generate SEO Article")
-        if st.button("📝 Generate Full Article Content", use_container_width=True, disabled=not selected_group_dicts or not st.session_state.gemini_model):
-            if not st.session_state.gemini_model:
-                st.error("Gemini API key not configured.")
-            elif not selected_group_dicts:
+        if st.button("📝 Generate Full Article Content", use_container_width=True, disabled=not selected_groups or not st.session_state.llm_backend):
+            if not st.session_state.llm_backend:
+                st.error("LLM backend not configured. Enter a Gemini API key or choose the local fake in the sidebar.")
+            elif not selected_groups:
                 st.error("No groups selected to include in the article.")
             else:
-                missing_descriptions = [g["Group Name"] for g in selected_group_dicts if not g.get("Description", "").strip()]
+                missing_descriptions = [g["Group Name"] for g in selected_groups if not g.get("Description", "").strip()]
                 if missing_descriptions:
                     st.warning(f"Some selected groups are missing descriptions: {', '.join(missing_descriptions)}. Please generate descriptions first or they will use fallbacks.")
 
-                with st.spinner("Gemini AI is crafting your SEO-optimized article... This may take a moment."):
-                    try:
-                        groups_html_for_ai = generate_html_table_for_ai(selected_group_dicts)
-                        
-                        current_year = time.strftime("%Y")
-                        final_post_title = st.session_state.post_title_template.replace("{target_keyword}", st.session_state.target_keyword).replace("[Current Year]", current_year)
-
-                        prompt_payload = SYSTEM_PROMPT.format(
-                            target_keyword=st.session_state.target_keyword,
-                            lsi_keywords=st.session_state.lsi_keywords,
-                            local_keywords=st.session_state.local_keywords if st.session_state.local_keywords else "Not specified",
-                        )
-                        prompt_payload += f"\n\n**Article Title to Generate:** {final_post_title}\n"
-                        prompt_payload += f"\n**Use the following table of WhatsApp groups in the 'Top {st.session_state.target_keyword} WhatsApp Groups of {current_year}' section:**\n{groups_html_for_ai}\n"
-                        prompt_payload += f"\nRemember to replace `[Current Year]` in the content with `{current_year}`."
-
-                        response = st.session_state.gemini_model.generate_content(prompt_payload)
-                        st.session_state.generated_article_content = response.text
+                current_year = time.strftime("%Y")
+                final_post_title = build_post_title(st.session_state.post_title_template, st.session_state.target_keyword, current_year)
+                article_request = build_article_prompt(
+                    st.session_state.target_keyword, st.session_state.lsi_keywords, st.session_state.local_keywords,
+                    final_post_title, selected_groups, current_year, token_budget=int(article_token_budget),
+                )
+                prompt_payload = article_request["prompt"]
+                table_html = article_request["table_html"]
+                st.session_state.article_table_html = table_html
+                if article_request["stats"]["over_budget"]:
+                    st.warning(f"The prompt is about {article_request['stats']['prompt_tokens']} tokens even without the group list, over the {int(article_token_budget)}-token budget.")
+                if background_jobs:
+                    attach_job("article", get_job_runner().submit(
+                        "article", {"prompt": prompt_payload, "table_html": table_html, "stream": stream_article_output,
+                                    "prompt_stats": article_request["stats"], "backend": st.session_state.llm_backend.identity()},
+                        resources={"llm_backend": st.session_state.llm_backend}))
+                elif stream_article_output:
+                    st.session_state.article_prompt = prompt_payload
+                    live_article = st.empty()
+                    generation = stream_article(st.session_state.llm_backend, prompt_payload, on_chunk=lambda text: live_article.markdown(text + " ▌"))
+                    live_article.empty()
+                    generation["prompt"] = article_request["stats"]
+                    st.session_state.article_generation_stats = generation
+                    set_generated_article(stitch_article_table(generation["text"], table_html, generation["complete"]) or None)
+                    if generation["complete"]:
                         st.success("Article content generated successfully!")
-                    except Exception as e:
-                        st.error(f"Error generating content with Gemini: {e}")
-                        st.session_state.generated_article_content = None
+                    elif generation["text"]:
+                        st.warning(f"Generation stopped after {len(generation['text'])} characters ({generation['error']}). The partial article was kept; continue it below or edit it as is.")
+                    else:
+                        st.error(f"Error generating content with {st.session_state.llm_backend.name}: {generation['error']}")
+                else:
+                    with st.spinner(f"{st.session_state.llm_backend.name} is crafting your SEO-optimized article... This may take a moment."):
+                        try:
+                            started = time.perf_counter()
+                            article_text = st.session_state.llm_backend.generate_article(prompt_payload)
+                            set_generated_article(stitch_article_table(article_text, table_html))
+                            elapsed = time.perf_counter() - started
+                            st.session_state.article_generation_stats = {"text": article_text, "complete": True, "error": None, "time_to_first_token": elapsed,
+                                                                         "total_time": elapsed, "prompt": article_request["stats"]}
+                            st.success("Article content generated successfully!")
+                        except Exception as e:
+                            st.error(f"Error generating content with {st.session_state.llm_backend.name}: {e}")
+                            st.session_state.generated_article_content = None
+
+        if "article" in st.session_state.jobs:
+            render_job_progress("article")
+        generation = st.session_state.article_generation_stats
+        if generation:
+            first_token = f"{generation['time_to_first_token']:.1f} s" if generation["time_to_first_token"] is not None else "n/a"
+            st.caption(f"Last generation: first token after {first_token}, total {generation['total_time']:.1f} s, "
+                       f"{len(st.session_state.generated_article_content or '')} characters.")
+            prompt_stats = generation.get("prompt")
+            if prompt_stats and st.session_state.llm_backend:
+                output_tokens = estimate_tokens(generation["text"].replace(st.session_state.article_table_html or ARTICLE_TABLE_MARKER, ""))
+                cost = article_cost(st.session_state.llm_backend, prompt_stats["prompt_tokens"], output_tokens)
+                st.caption(f"Prompt: ~{prompt_stats['prompt_tokens']} tokens of a {prompt_stats['budget']} budget, "
+                           f"{prompt_stats['groups_listed']}/{prompt_stats['groups_total']} groups listed; "
+                           f"output ~{output_tokens} tokens; estimated cost ${cost:.4f} with {st.session_state.llm_backend.name}.")
+            if not generation["complete"] and st.session_state.generated_article_content and st.session_state.article_prompt:
+                if st.button("▶️ Continue Partial Article", use_container_width=True, disabled=not st.session_state.llm_backend):
+                    partial_text = st.session_state.generated_article_content
+                    live_article = st.empty()
+                    continuation = stream_article(
+                        st.session_state.llm_backend, build_continuation_prompt(st.session_state.article_prompt, partial_text),
+                        on_chunk=lambda text: live_article.markdown(partial_text + text + " ▌"),
+                    )
+                    live_article.empty()
+                    continuation["text"] = partial_text + continuation["text"]
+                    continuation["total_time"] += generation["total_time"]
+                    continuation["prompt"] = generation.get("prompt")
+                    st.session_state.article_generation_stats = continuation
+                    set_generated_article(stitch_article_table(continuation["text"], st.session_state.article_table_html or "", continuation["complete"]))
+                    st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
 
@@ -492,12 +3378,13 @@ def main():
         st.subheader("4. Review & Post to WordPress")
         
         current_year_wp = time.strftime("%Y")
-        final_post_title_for_wp = st.session_state.post_title_template.replace("{target_keyword}", st.session_state.target_keyword).replace("[Current Year]", current_year_wp)
+        final_post_title_for_wp = build_post_title(st.session_state.post_title_template, st.session_state.target_keyword, current_year_wp)
         
-        # Allow editing of generated content
+        # Allow editing of generated content. The widget state is kept in sync by set_generated_article.
+        if "article_review_and_edit_area" not in st.session_state:
+            st.session_state.article_review_and_edit_area = st.session_state.generated_article_content
         st.session_state.generated_article_content = st.text_area(
             "Generated Article Content (Editable):", 
-            value=st.session_state.generated_article_content, 
             height=400, 
             key="article_review_and_edit_area"
         )
@@ -512,37 +3399,22 @@ def main():
                         wp_pass = st.secrets["wordpress"]["app_password"]
                         wp_url = st.secrets["wordpress"]["site_url"]
                         
-                        auth = (wp_user, wp_pass)
-                        
-                        # Define post_data dictionary
-                        post_data = {
-                            'title': final_post_title_for_wp,
-                            'content': st.session_state.generated_article_content, 
-                            'status': 'draft',
-                            'slug': f"{st.session_state.target_keyword.lower().replace(' ', '-')}-whatsapp-groups-{current_year_wp.lower()}"
-                            # 'tags' key is intentionally omitted as per user request
-                        }
+                        slug = build_post_slug(st.session_state.target_keyword, current_year_wp)
                         
                         # --- START DEBUGGING LINE ---
-                        st.info(f"Data being sent to WordPress: {post_data}") 
+                        st.info(f"Data being sent to WordPress: {dict(title=final_post_title_for_wp, content=st.session_state.generated_article_content, status='draft', slug=slug)}") 
                         # --- END DEBUGGING LINE ---
                         
-                        api_url = f"{wp_url.rstrip('/')}/wp-json/wp/v2/posts"
-                        
-                        response = requests.post(api_url, auth=auth, json=post_data, timeout=30)
-                        
-                        if response.status_code == 201: 
-                            post_link = response.json().get('link', '#')
-                            st.success(f"Article posted as a draft to WordPress! Edit here: {post_link}")
+                        publisher = get_wordpress_publisher(wp_url, wp_user, wp_pass)
+                        post = publisher.create_draft(final_post_title_for_wp, st.session_state.generated_article_content, slug)
+                        if post["created"]:
+                            st.success(f"Article posted as a draft to WordPress! Edit here: {post['link']}")
                         else:
-                            try:
-                                error_details = response.json()
-                                code = error_details.get("code", "N/A")
-                                message = error_details.get("message", "No message.")
-                                st.error(f"Failed to post to WordPress: {response.status_code} - {code}. Message: {message}")
-                                st.json(error_details) 
-                            except requests.exceptions.JSONDecodeError:
-                                st.error(f"Failed to post to WordPress: {response.status_code} - {response.text[:200]}")
+                            st.info(f"A post with the slug '{slug}' already exists, so nothing new was created. Edit it here: {post['link']}")
+                    except WordPressError as e:
+                        st.error(f"Failed to post to WordPress: {e}")
+                        if isinstance(e.details, dict):
+                            st.json(e.details) 
                     except KeyError as e:
                         st.error(f"WordPress secret key error: '{e}' not found. Please check your secrets.toml.")
                     except requests.exceptions.RequestException as e:
@@ -551,6 +3423,9 @@ def main():
                         st.error(f"An unexpected error occurred while posting to WordPress: {e}")
         st.markdown('</div>', unsafe_allow_html=True)
 
+    render_jobs_panel()
+    render_performance_panel()
+
 if __name__ == "__main__":
     if isinstance(html, str):
         st.error("CRITICAL ERROR: The 'html' module has been overwritten by a string variable. This will cause `html.escape` to fail. Check your code for `html = ...` assignments.")
@@ -0,0 +1,222 @@
+"""Headless batch runner: search, scrape, validate, describe, generate and post for many keywords.
+
+Usage:
+    python batch.py keywords.csv --out results.jsonl [--workers 2] [--llm gemini|fake] [--post] [--metrics metrics.json]
+
+The input is a CSV file with a header row, or a JSONL file, with one keyword per row.
+Each row needs `keyword` and `query`; `lsi_keywords`, `local_keywords`, `top_n` and
+`title_template` are optional. Each finished row is appended to the output JSONL file.
+Re-running with the same output file skips rows already marked "done", so an
+interrupted batch picks up where it stopped.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import threading
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import app
+
+DEFAULT_TITLE_TEMPLATE = "Top {target_keyword} WhatsApp Groups [Current Year]"
+STAGES = ("search", "scrape_validate", "describe", "generate", "post")
+
+
+class StageStats:
+    """Thread-safe per-stage timing and item counts for throughput reporting."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.runs = {stage: 0 for stage in STAGES}
+        self.items = {stage: 0 for stage in STAGES}
+        self.errors = {stage: 0 for stage in STAGES}
+
+    @contextlib.contextmanager
+    def timed(self, stage, timings):
+        """Times one stage of one row. The body may set counter["items"] to report work done."""
+        counter = {"items": 0}
+        started = time.perf_counter()
+        try:
+            yield counter
+        except Exception:
+            with self._lock:
+                self.errors[stage] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            timings[stage] = round(elapsed, 3)
+            with self._lock:
+                self.seconds[stage] += elapsed
+                self.runs[stage] += 1
+                self.items[stage] += counter["items"]
+
+    def report(self, wall_seconds, rows_done):
+        lines = [f"{'stage':<16}{'runs':>6}{'errors':>8}{'total s':>10}{'mean s':>9}{'items':>8}{'items/s':>9}"]
+        for stage in STAGES:
+            runs, seconds, items = self.runs[stage], self.seconds[stage], self.items[stage]
+            if not runs:
+                continue
+            rate = f"{items / seconds:9.2f}" if seconds and items else f"{'-':>9}"
+            lines.append(f"{stage:<16}{runs:>6}{self.errors[stage]:>8}{seconds:>10.2f}{seconds / runs:>9.2f}{items:>8}{rate}")
+        per_minute = rows_done / wall_seconds * 60 if wall_seconds else 0.0
+        lines.append(f"{rows_done} rows in {wall_seconds:.1f} s ({per_minute:.2f} rows/min)")
+        return "\n".join(lines)
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    return [row for row in rows if row.get("keyword") and row.get("query")]
+
+
+def row_key(row):
+    return f"{row['keyword']}\t{row['query']}"
+
+
+def load_done_keys(out_path):
+    """Returns the keys of rows already completed in a previous run of the same batch."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # A partially written last line from an interrupted run
+            if record.get("status") == "done":
+                done.add(row_key(record))
+    return done
+
+
+def load_secrets(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def build_backend(args, secrets):
+    if args.llm == "fake":
+        return app.FakeLLMBackend(latency=args.fake_latency, failure_rate=args.fake_failure_rate)
+    api_key = args.gemini_api_key or os.environ.get("GEMINI_API_KEY") or secrets.get("gemini", {}).get("api_key")
+    if not api_key:
+        raise SystemExit("No Gemini API key: pass --gemini-api-key, set GEMINI_API_KEY or add [gemini] api_key to the secrets file.")
+    return app.GeminiBackend(api_key)
+
+
+def process_row(row, args, llm_backend, wordpress, stats):
+    """Runs the full pipeline for one keyword row and returns its output record."""
+    keyword = row["keyword"]
+    current_year = time.strftime("%Y")
+    title = app.build_post_title(row.get("title_template") or DEFAULT_TITLE_TEMPLATE, keyword, current_year)
+    timings = {}
+    record = {"keyword": keyword, "query": row["query"], "status": "failed", "error": None, "title": title,
+              "slug": app.build_post_slug(keyword, current_year), "groups": [], "article": None, "prompt": None, "post": None, "timings": timings}
+    try:
+        with stats.timed("search", timings) as counter:
+            page_urls = app.search_result_urls(row["query"], int(row.get("top_n") or args.top_n))
+            counter["items"] = len(page_urls)
+        if not page_urls:
+            raise RuntimeError("No search results returned from Google.")
+
+        with stats.timed("scrape_validate", timings) as counter:
+            duplicates = app.DuplicateGroupFilter()
+            for event in app.iter_scrape_and_validate(page_urls, force_revalidate=args.force_revalidate):
+                if event[0] == "result":
+                    counter["items"] += 1
+                    if app.is_listable_group(event[1]) and duplicates.accept(event[1]):
+                        record["groups"].append(event[1])
+        if not record["groups"]:
+            raise RuntimeError("No active WhatsApp groups found.")
+
+        with stats.timed("describe", timings) as counter:
+            names = [group["Group Name"] for group in record["groups"]]
+            descriptions = app.generate_ai_descriptions(names, llm_backend)
+            for group in record["groups"]:
+                group["Description"] = descriptions.get(group["Group Name"], "")
+            counter["items"] = len(names)
+
+        with stats.timed("generate", timings) as counter:
+            article_request = app.build_article_prompt(keyword, row.get("lsi_keywords", ""), row.get("local_keywords", ""),
+                                                       title, record["groups"], current_year, token_budget=args.prompt_budget)
+            article_text = llm_backend.generate_article(article_request["prompt"])
+            record["article"] = app.stitch_article_table(article_text, article_request["table_html"])
+            output_tokens = app.estimate_tokens(article_text)
+            record["prompt"] = dict(article_request["stats"], output_tokens=output_tokens,
+                                    cost_usd=round(app.article_cost(llm_backend, article_request["stats"]["prompt_tokens"], output_tokens), 6))
+            counter["items"] = 1
+
+        if wordpress:
+            with stats.timed("post", timings) as counter:
+                record["post"] = wordpress.create_draft(title, record["article"], record["slug"])
+                counter["items"] = 1
+        record["status"] = "done"
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL file of keyword rows.")
+    parser.add_argument("--out", default="batch_results.jsonl", help="Output JSONL file; also used to resume.")
+    parser.add_argument("--workers", type=int, default=2, help="Keywords processed concurrently.")
+    parser.add_argument("--top-n", type=int, default=5, help="Google results to scrape when a row has no top_n.")
+    parser.add_argument("--force-revalidate", action="store_true", help="Ignore the link validation cache.")
+    parser.add_argument("--llm", choices=("gemini", "fake"), default="gemini")
+    parser.add_argument("--gemini-api-key")
+    parser.add_argument("--fake-latency", type=float, default=0.5)
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0)
+    parser.add_argument("--prompt-budget", type=int, default=app.ARTICLE_PROMPT_TOKEN_BUDGET, help="Estimated token cap for each article prompt.")
+    parser.add_argument("--post", action="store_true", help="Post each article to WordPress as a draft.")
+    parser.add_argument("--secrets", default="secrets.toml", help="TOML file with [gemini] and [wordpress] sections.")
+    parser.add_argument("--metrics", help="Write the per-stage latency, error and cache metrics to this JSON file.")
+    args = parser.parse_args()
+
+    secrets = load_secrets(args.secrets)
+    llm_backend = build_backend(args, secrets)
+    wordpress = None
+    if args.post:
+        wp_secrets = secrets.get("wordpress", {})
+        missing = [key for key in ("username", "app_password", "site_url") if not wp_secrets.get(key)]
+        if missing:
+            raise SystemExit(f"--post needs wordpress.{', wordpress.'.join(missing)} in {args.secrets}.")
+        wordpress = app.WordPressPublisher(wp_secrets["site_url"], (wp_secrets["username"], wp_secrets["app_password"]))
+
+    rows = read_rows(args.input)
+    done_keys = load_done_keys(args.out)
+    todo = [row for row in rows if row_key(row) not in done_keys]
+    print(f"{len(rows)} rows, {len(rows) - len(todo)} already done, {len(todo)} to run with {args.workers} workers")
+
+    stats = StageStats()
+    write_lock = threading.Lock()
+    started = time.perf_counter()
+    rows_done = 0
+    with open(args.out, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(process_row, row, args, llm_backend, wordpress, stats): row for row in todo}
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            rows_done += record["status"] == "done"
+            print(f"[{record['status']}] {record['keyword']}: {len(record['groups'])} groups"
+                  + (f" - {record['error']}" if record["error"] else ""))
+
+    print(stats.report(time.perf_counter() - started, rows_done))
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(app.METRICS.to_json())
+    return 0 if rows_done == len(todo) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
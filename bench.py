@@ -0,0 +1,596 @@
+"""Micro-benchmarks for the WhatsApp Content Generator.
+
+Usage:
+    python bench.py meta [--corpus DIR] [--repeat N]
+    python bench.py links [--corpus DIR] [--repeat N]
+    python bench.py llm [--groups N] [--latency S] [--failure-rate F]
+    python bench.py pipeline [--pages N] [--latency S] [--dead-rate F] [--error-rate F]
+                             [--save-baseline FILE | --baseline FILE [--tolerance F]]
+    python bench.py startup [--runs N] [--budget-ms MS]
+"""
+import argparse
+import glob
+import hashlib
+import http.server
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import app
+
+
+class SavedResponse:
+    """Feeds a saved page to code that expects a streamed requests response."""
+
+    def __init__(self, body, encoding="utf-8"):
+        self.body = body
+        self.encoding = encoding
+
+    def iter_content(self, chunk_size=8192):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+def synthetic_invite_page(index):
+    """Builds a page shaped like a chat.whatsapp.com invite page: heavy head, large body.
+
+    About every third page has a ">" inside its quoted og:title, which must not end the tag.
+    """
+    head_filler = "".join(f'<link rel="preload" href="/static/asset{n}.js" as="script">' for n in range(60))
+    scripts = "".join(f"<script>window.__data{n} = {{\"k\": \"{'x' * 200}\"}};</script>" for n in range(20))
+    title = f"Crypto -> Signals #{index}" if str(index)[-1] in "258" else f"Study Group #{index} &amp;amp; Friends"
+    body_filler = "".join(f'<div class="_9vd5"><span>Row {n} &amp; more text</span><a href="/l/{n}">link</a></div>' for n in range(800))
+    return (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>WhatsApp Group Invite</title>{head_filler}"
+        f"<meta property=\"og:title\" content=\"{title}\">"
+        f"<meta property=\"og:image\" content=\"https://pps.whatsapp.net/v/t61/{index}.jpg?ccb=11-4&amp;oh=abc\">"
+        f"<meta property=\"og:site_name\" content=\"WhatsApp.com\">{scripts}</head>"
+        f"<body>{body_filler}</body></html>"
+    ).encode("utf-8")
+
+
+def synthetic_result_page(index, anchors=3000):
+    """Builds a directory-style result page with thousands of anchors and a few invite links mixed in.
+
+    Every fifth page spells the invite host in mixed case only, so a case-sensitive
+    page pre-filter would miss all of its links.
+    """
+    host = "HTTPS://Chat.WhatsApp.com" if index % 5 == 4 else "https://chat.whatsapp.com"
+    insecure_host = host.replace("HTTPS://", "HTTP://").replace("https://", "http://")
+    rows = []
+    for n in range(anchors):
+        if n % 50 == 0:
+            rows.append(f'<li><a class="join" href="{host}/Inv{index}x{n}?utm_source=dir&amp;ref={n}">Join</a></li>')
+        elif n % 50 == 1:
+            rows.append(f'<li><a href="{host}/Inv{index}x{n - 1}/">Join again</a></li>')
+        elif n % 97 == 0:
+            rows.append(f'<li><a href="{insecure_host}/Plain{n}">insecure</a><a href=\'{host}/invite/Alt{n}#x\'>alt</a></li>')
+        else:
+            rows.append(f'<li><a href="/category/{n}" title="Category {n}">Category {n}</a> <span>&amp; details</span></li>')
+    tricky = (
+        f'<!-- <a href="{host}/Commented">x</a> -->'
+        f'<script>var s = \'<a href="{host}/InScript">x</a>\';</script>'
+        f'<a>no href</a><a href>empty</a><A HREF="{host}/Upper">u</A>'
+    )
+    return f"<html><head><title>Groups {index}</title></head><body>{tricky}<ul>{''.join(rows)}</ul></body></html>".encode("utf-8")
+
+
+def load_corpus(corpus_dir, synthetic=synthetic_invite_page, count=50):
+    if not corpus_dir:
+        return [synthetic(i) for i in range(count)]
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.htm*"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def meta_fast_path(page):
+    head_bytes, head_complete = app.read_html_head(SavedResponse(page))
+    og_meta = app.extract_og_meta_fast(head_bytes.decode("utf-8", errors="replace")) if head_complete else None
+    if og_meta is None:
+        return app.extract_og_meta_soup(page.decode("utf-8", errors="replace")), len(page)
+    return og_meta, len(head_bytes)
+
+
+def meta_soup_path(page):
+    return app.extract_og_meta_soup(page.decode("utf-8", errors="replace")), len(page)
+
+
+def time_path(func, pages, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for page in pages:
+            func(page)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def run_meta(args):
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"No .html files found in {args.corpus}")
+        return 1
+    mismatches = 0
+    fast_bytes = 0
+    for page in pages:
+        (fast_meta, bytes_read), (soup_meta, _) = meta_fast_path(page), meta_soup_path(page)
+        fast_bytes += bytes_read
+        if fast_meta != soup_meta:
+            mismatches += 1
+            print(f"MISMATCH fast={fast_meta!r} soup={soup_meta!r}")
+    total_bytes = sum(len(page) for page in pages)
+    soup_time = time_path(meta_soup_path, pages, args.repeat)
+    fast_time = time_path(meta_fast_path, pages, args.repeat)
+    print(f"pages: {len(pages)}  corpus: {total_bytes / 1024:.0f} KiB  fast path read: {fast_bytes / 1024:.0f} KiB")
+    print(f"soup path: {soup_time * 1000 / len(pages):8.3f} ms/page")
+    print(f"fast path: {fast_time * 1000 / len(pages):8.3f} ms/page  ({soup_time / fast_time:.1f}x)")
+    print(f"mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+def run_links(args):
+    pages = load_corpus(args.corpus, synthetic=synthetic_result_page, count=20)
+    if not pages:
+        print(f"No .html files found in {args.corpus}")
+        return 1
+    if not args.corpus:
+        pages.append(b"<html><body>" + b"<a href='/x'>x</a>" * 3000 + b"</body></html>")
+    mismatches = 0
+    for page in pages:
+        text = page.decode("utf-8", errors="replace")
+        fast_links, soup_links = app.extract_whatsapp_links(text), app.extract_whatsapp_links_soup(text)
+        if fast_links != soup_links:
+            mismatches += 1
+            print(f"MISMATCH only-fast={sorted(fast_links - soup_links)} only-soup={sorted(soup_links - fast_links)}")
+    texts = [page.decode("utf-8", errors="replace") for page in pages]
+    soup_time = time_path(app.extract_whatsapp_links_soup, texts, args.repeat)
+    fast_time = time_path(app.extract_whatsapp_links, texts, args.repeat)
+    print(f"pages: {len(pages)}  corpus: {sum(len(page) for page in pages) / 1024:.0f} KiB")
+    print(f"soup path: {soup_time * 1000 / len(pages):8.3f} ms/page")
+    print(f"fast path: {fast_time * 1000 / len(pages):8.3f} ms/page  ({soup_time / fast_time:.1f}x)")
+    print(f"mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+def run_llm(args):
+    names = [f"Study Group {n}" for n in range(args.groups)]
+    groups = [{"Group Name": name, "Group Link": f"https://chat.whatsapp.com/Bench{n}", "Description": ""} for n, name in enumerate(names)]
+    print(f"groups: {args.groups}  latency: {args.latency}s  failure rate: {args.failure_rate}")
+    for label, batch_size in (("single", 1), ("batched", app.DESCRIPTION_BATCH_SIZE)):
+        backend = app.FakeLLMBackend(latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+        started = time.perf_counter()
+        descriptions = app.generate_ai_descriptions(names, backend, cache=app.DescriptionCache(":memory:"), batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"descriptions ({label:>7}): {elapsed:7.2f} s  calls: {backend.calls:4d}  described: {len(descriptions)}")
+        for group in groups:
+            group["Description"] = descriptions[group["Group Name"]]
+    backend = app.FakeLLMBackend(latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+    article_request = app.build_article_prompt("Study Groups", "exam prep", "", "Top Study Groups WhatsApp Groups 2026", groups, "2026",
+                                               token_budget=args.prompt_budget)
+    prompt_stats = article_request["stats"]
+    print(f"prompt: ~{prompt_stats['prompt_tokens']} tokens (budget {prompt_stats['budget']})  groups listed: "
+          f"{prompt_stats['groups_listed']}/{prompt_stats['groups_total']}  table: {len(article_request['table_html'])} chars, not sent")
+    started = time.perf_counter()
+    try:
+        article = app.stitch_article_table(backend.generate_article(article_request["prompt"]), article_request["table_html"])
+        print(f"article: {time.perf_counter() - started:7.2f} s  prompt: {len(article_request['prompt'])} chars  article: {len(article)} chars")
+    except app.FakeLLMError as e:
+        print(f"article: failed after {time.perf_counter() - started:.2f} s ({e})")
+    return 0
+
+
+class _QuietHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # validate_link hangs up once it has read an invite page's head; that is expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class MockServer:
+    """Local stand-in for result pages, chat.whatsapp.com invite pages and the WordPress REST API.
+
+    Result pages live at /results/<n> and carry an ETag, so a conditional re-fetch
+    gets a 304. Invite codes are served at /<code>; whether a
+    code is live, dead (redirected away from the invite host, like a revoked link) or
+    failing (HTTP 500) is decided by a hash of the code, so runs are repeatable. A
+    `throttle_rate` share of invite requests, drawn at random, get 429 with Retry-After.
+    Every response waits `latency` seconds plus up to `jitter` seconds first.
+    `connections` counts the TCP connections accepted, to show keep-alive reuse.
+    """
+
+    def __init__(self, anchors=3000, latency=0.0, jitter=0.0, dead_rate=0.2, error_rate=0.02, throttle_rate=0.0,
+                 wp_latency=0.0, wp_error_rate=0.0):
+        self.anchors = anchors
+        self.latency = latency
+        self.jitter = jitter
+        self.dead_rate = dead_rate
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.wp_latency = wp_latency
+        self.wp_error_rate = wp_error_rate
+        self.posts = {}
+        self.connections = 0
+        self._posts_lock = threading.Lock()
+        self._httpd = _QuietHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    @staticmethod
+    def _roll(key):
+        """Returns a repeatable number in [0, 1) for a key."""
+        return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big") / 2 ** 64
+
+    def _delay(self, key, latency):
+        if latency or self.jitter:
+            time.sleep(latency + self._roll("jitter:" + key) * self.jitter)
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with mock._posts_lock:
+                    mock.connections += 1
+
+            def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=()):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_json(self, status, payload):
+                self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.startswith("/wp-json/"):
+                    return self._wordpress_lookup(parse_qs(url.query))
+                mock._delay(url.path, mock.latency)
+                if url.path.startswith("/results/"):
+                    etag = f'"{url.path.rsplit("/", 1)[1]}-{mock.anchors}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._send(304, headers=[("ETag", etag)])
+                    return self._send(200, synthetic_result_page(int(url.path.rsplit("/", 1)[1]), mock.anchors), headers=[("ETag", etag)])
+                if url.path == "/expired":
+                    return self._send(200, b"<html><head><title>WhatsApp</title></head><body>Link revoked</body></html>")
+                if mock._roll(f"throttle:{url.path}:{time.perf_counter()}") < mock.throttle_rate:
+                    return self._send(429, b"Too many requests", headers=[("Retry-After", "1")])
+                roll = mock._roll(url.path)
+                if roll < mock.dead_rate:
+                    return self._send(302, headers=[("Location", f"{mock.base_url}/expired")])
+                if roll < mock.dead_rate + mock.error_rate:
+                    return self._send(500, b"Internal error")
+                return self._send(200, synthetic_invite_page(url.path.strip("/")))
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                mock._delay(payload.get("slug", ""), mock.wp_latency)
+                if mock._roll(f"wp:{payload.get('slug')}:{time.perf_counter()}") < mock.wp_error_rate:
+                    return self._send_json(503, {"code": "unavailable", "message": "Simulated outage"})
+                with mock._posts_lock:
+                    post_id = len(mock.posts) + 1
+                    mock.posts[post_id] = {"id": post_id, "link": f"{mock.base_url}/?p={post_id}", "slug": payload.get("slug"), "status": "draft"}
+                self._send_json(201, mock.posts[post_id])
+
+            def _wordpress_lookup(self, query):
+                slug = query.get("slug", [""])[0]
+                mock._delay(slug, mock.wp_latency)
+                with mock._posts_lock:
+                    matches = [post for post in mock.posts.values() if post["slug"] == slug]
+                self._send_json(200, matches)
+
+        return Handler
+
+
+class InviteHostAdapter(requests.adapters.HTTPAdapter):
+    """Sends requests for WHATSAPP_DOMAIN to the mock server while responses keep the invite URL."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/") + "/"
+
+    def send(self, request, **kwargs):
+        original_url = request.url
+        request.url = self.base_url + original_url[len(app.WHATSAPP_DOMAIN):]
+        response = super().send(request, **kwargs)
+        request.url = original_url
+        if response.url.startswith(self.base_url):
+            response.url = app.WHATSAPP_DOMAIN + response.url[len(self.base_url):]
+        return response
+
+
+class _NullProgress:
+    """Accepts the Streamlit progress bar and status text calls scrape_google makes."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def latency_summary(snapshot, stage):
+    stats = snapshot["stages"].get(stage)
+    if not stats:
+        return {}
+    return {f"{stage}_p50_ms": stats["p50_ms"], f"{stage}_p95_ms": stats["p95_ms"], f"{stage}_errors": stats["errors"]}
+
+
+def print_host_limits():
+    for host in app.SCHEDULER.snapshot():
+        print(f"  host {host['host']}: limit={host['limit']} circuit={host['circuit']} latency_ms={host['latency_ms']} "
+              f"timeout_s={host['timeout_s']} successes={host['successes']} failures={host['failures']} last_error={host['last_error']}")
+
+
+def measure(label, func):
+    """Runs func() with fresh metrics and memory tracing. Returns (func's result, report dict).
+
+    tracemalloc slows allocation-heavy code, so compare timings only against
+    baselines recorded the same way.
+    """
+    app.METRICS.reset()
+    app.SCHEDULER.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, {"phase": label, "seconds": round(elapsed, 3), "peak_mib": round(peak / 2 ** 20, 2)}
+
+
+def run_pipeline_phases(args, mock):
+    page_urls = [f"{mock.base_url}/results/{n}" for n in range(args.pages)]
+    page_cache = app.PageCache(":memory:")
+    validation_cache = app.LinkValidationCache(":memory:")
+    reports = []
+
+    def pipelined():
+        mock.connections = 0
+        return [event[1] for event in app.iter_scrape_and_validate(page_urls, cache=validation_cache, force_revalidate=True, page_delay=0, page_cache=page_cache)
+                if event[0] == "result"]
+
+    results, report = measure("scrape_validate", pipelined)
+    snapshot = app.METRICS.snapshot()
+    report.update(links=len(results), active=sum(result["Status"] == "Active" for result in results),
+                  links_per_s=round(len(results) / report["seconds"], 1), connections=mock.connections,
+                  **latency_summary(snapshot, "page_fetch"), **latency_summary(snapshot, "validate_link"))
+    reports.append(report)
+    print_host_limits()
+
+    def rescrape():
+        with requests.Session() as session:
+            return [app.fetch_whatsapp_links(url, session, page_cache=page_cache) for url in page_urls]
+
+    def rerun_after_ttl():
+        # A run after every cached result has expired: only the dead-invite set is left to skip requests.
+        validation_cache.purge_expired(now=time.time() + app.EXPIRED_CACHE_TTL + 1)
+        mock.connections = 0
+        stats = {}
+        results = [event[1] for event in app.iter_scrape_and_validate(page_urls, cache=validation_cache, stats=stats, page_delay=0, page_cache=page_cache)
+                   if event[0] == "result"]
+        return results, stats
+
+    (rerun_results, rerun_stats), report = measure("rerun_after_ttl", rerun_after_ttl)
+    report.update(links=len(rerun_results), validated=rerun_stats["misses"], dead_skipped=rerun_stats["hits"],
+                  dead_codes=validation_cache.dead_count(), connections=mock.connections, **latency_summary(app.METRICS.snapshot(), "validate_link"))
+    reports.append(report)
+
+    link_sets, report = measure("rescrape_pages", rescrape)
+    page_stats = page_cache.stats()
+    report.update(pages=len(link_sets), links=len(set().union(*link_sets)), pages_per_s=round(len(link_sets) / report["seconds"], 1),
+                  revalidated=page_stats["revalidated"], kib_saved=round(page_stats["bytes_saved"] / 1024, 1),
+                  **latency_summary(app.METRICS.snapshot(), "page_fetch"))
+    reports.append(report)
+
+    if args.sequential:
+        def sequential():
+            search = app.search_result_urls
+            app.search_result_urls = lambda query, top_n: page_urls[:top_n]
+            try:
+                links = app.scrape_google("benchmark", len(page_urls), _NullProgress(), _NullProgress(), page_cache=app.PageCache(":memory:"))
+            finally:
+                app.search_result_urls = search
+            return list(app.iter_validated_links_cached(links, cache=app.LinkValidationCache(":memory:"), force_revalidate=True))
+
+        results, report = measure("scrape_google_then_validate", sequential)
+        snapshot = app.METRICS.snapshot()
+        report.update(links=len(results), links_per_s=round(len(results) / report["seconds"], 1),
+                      **latency_summary(snapshot, "page_fetch"), **latency_summary(snapshot, "validate_link"))
+        reports.append(report)
+
+    duplicates = app.DuplicateGroupFilter()
+    groups = [result for result in results if app.is_listable_group(result) and duplicates.accept(result)]
+    backend = app.FakeLLMBackend(latency=args.llm_latency, seed=0)
+
+    def describe_and_generate():
+        descriptions = app.generate_ai_descriptions([group["Group Name"] for group in groups], backend, cache=app.DescriptionCache(":memory:"))
+        for group in groups:
+            group["Description"] = descriptions.get(group["Group Name"], "")
+        article_request = app.build_article_prompt("Benchmark", "", "", "Top Benchmark WhatsApp Groups 2026", groups, "2026")
+        article = app.stitch_article_table(backend.generate_article(article_request["prompt"]), article_request["table_html"])
+        return article, article_request["stats"]
+
+    (article, prompt_stats), report = measure("describe_generate", describe_and_generate)
+    report.update(groups=len(groups), llm_calls=backend.calls, article_chars=len(article),
+                  prompt_tokens=prompt_stats["prompt_tokens"], groups_in_prompt=prompt_stats["groups_listed"])
+    reports.append(report)
+
+    publisher = app.WordPressPublisher(mock.base_url, ("bench", "bench"), backoff=0.05)
+    drafts = [{"title": f"Benchmark {n}", "content": article, "slug": f"benchmark-{n}"} for n in range(args.posts)]
+    posted, report = measure("post", lambda: publisher.post_drafts(drafts + drafts[: args.posts // 2]))
+    publisher.close()
+    snapshot = app.METRICS.snapshot()
+    report.update(posts=len(posted), failed=sum("error" in post for post in posted), duplicates=len(mock.posts) - args.posts,
+                  posts_per_s=round(len(posted) / report["seconds"], 1), **latency_summary(snapshot, "wordpress_post"))
+    reports.append(report)
+    return reports
+
+
+def compare_to_baseline(reports, baseline, tolerance):
+    """Returns a line per metric that is worse than the baseline by more than `tolerance` (a fraction)."""
+    regressions = []
+    baseline_by_phase = {report["phase"]: report for report in baseline["phases"]}
+    for report in reports:
+        previous = baseline_by_phase.get(report["phase"])
+        if not previous:
+            continue
+        for metric, value in report.items():
+            old = previous.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            higher_is_better = metric.endswith("_per_s")
+            lower_is_better = metric == "seconds" or metric.endswith(("_ms", "_mib"))
+            if (higher_is_better and value < old * (1 - tolerance)) or (lower_is_better and value > old * (1 + tolerance)):
+                regressions.append(f"{report['phase']}.{metric}: {old} -> {value}")
+    return regressions
+
+
+def run_pipeline(args):
+    with MockServer(anchors=args.anchors, latency=args.latency, jitter=args.jitter, dead_rate=args.dead_rate,
+                    error_rate=args.error_rate, throttle_rate=args.throttle_rate, wp_latency=args.wp_latency, wp_error_rate=args.wp_error_rate) as mock:
+        app.get_http_session().mount(app.WHATSAPP_DOMAIN, InviteHostAdapter(
+            mock.base_url, pool_connections=app.PER_HOST_CONCURRENCY, pool_maxsize=app.VALIDATION_CONCURRENCY))
+        reports = run_pipeline_phases(args, mock)
+    for report in reports:
+        print("  ".join(f"{key}={value}" for key, value in report.items()))
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("func", "command", "baseline", "save_baseline", "tolerance")}
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "phases": reports}, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print("warning: baseline was recorded with different settings")
+        regressions = compare_to_baseline(reports, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"regressions: {len(regressions)} (tolerance {args.tolerance:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+# Modules app.py must not load at import time; each is imported on the code path that needs it.
+DEFERRED_MODULES = ("google.generativeai", "pandas", "bs4", "fake_useragent")
+
+# Runs in a fresh interpreter so nothing is already imported. A Streamlit rerun
+# re-executes app.py's module body, which is what the second timing measures.
+STARTUP_PROBE = """
+import json, runpy, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+runpy.run_path(app.__file__, run_name="bench_rerun")
+rerun = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "rerun_ms": (rerun - imported) * 1000,
+                  "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+
+def run_startup(args):
+    """Times `import app` and one module rerun in fresh interpreters, and checks the deferred imports stay deferred."""
+    probe = STARTUP_PROBE % (DEFERRED_MODULES,)
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(args.runs):
+        completed = subprocess.run([sys.executable, "-c", probe], cwd=here, capture_output=True, text=True, check=True)
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    import_ms = statistics.median(sample["import_ms"] for sample in samples)
+    rerun_ms = statistics.median(sample["rerun_ms"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["loaded"]})
+    print(f"import_ms p50={import_ms:.0f} min={min(s['import_ms'] for s in samples):.0f} "
+          f"max={max(s['import_ms'] for s in samples):.0f}  rerun_ms p50={rerun_ms:.0f}  runs={args.runs}")
+    failed = False
+    if loaded:
+        print(f"FAIL imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if args.budget_ms is not None:
+        within = import_ms <= args.budget_ms
+        print(f"{'ok' if within else 'FAIL'} import budget {args.budget_ms:.0f} ms")
+        failed = failed or not within
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    meta_parser = subparsers.add_parser("meta", help="Compare the fast og: meta extractor against BeautifulSoup.")
+    meta_parser.add_argument("--corpus", help="Directory of saved invite pages (*.html). Defaults to a synthetic corpus.")
+    meta_parser.add_argument("--repeat", type=int, default=5)
+    meta_parser.set_defaults(func=run_meta)
+
+    links_parser = subparsers.add_parser("links", help="Compare the fast anchor harvester against BeautifulSoup link extraction.")
+    links_parser.add_argument("--corpus", help="Directory of saved result pages (*.html). Defaults to a synthetic corpus.")
+    links_parser.add_argument("--repeat", type=int, default=3)
+    links_parser.set_defaults(func=run_links)
+
+    llm_parser = subparsers.add_parser("llm", help="Time the description and article pipelines against the local fake LLM.")
+    llm_parser.add_argument("--groups", type=int, default=100)
+    llm_parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake LLM call.")
+    llm_parser.add_argument("--failure-rate", type=float, default=0.1)
+    llm_parser.add_argument("--seed", type=int, default=0)
+    llm_parser.add_argument("--prompt-budget", type=int, default=app.ARTICLE_PROMPT_TOKEN_BUDGET, help="Estimated token cap for the article prompt.")
+    llm_parser.set_defaults(func=run_llm)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Run scrape, validate, describe and post against a local mock of every remote service.")
+    pipeline_parser.add_argument("--pages", type=int, default=10, help="Result pages to scrape.")
+    pipeline_parser.add_argument("--anchors", type=int, default=3000, help="Anchors per result page (one in fifty is an invite link).")
+    pipeline_parser.add_argument("--latency", type=float, default=0.05, help="Seconds the mock waits before each page or invite response.")
+    pipeline_parser.add_argument("--jitter", type=float, default=0.05, help="Extra random seconds per response, up to this much.")
+    pipeline_parser.add_argument("--dead-rate", type=float, default=0.2, help="Fraction of invite links that are revoked.")
+    pipeline_parser.add_argument("--error-rate", type=float, default=0.02, help="Fraction of invite links that answer HTTP 500.")
+    pipeline_parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of invite requests answered 429 with Retry-After: 1.")
+    pipeline_parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM call.")
+    pipeline_parser.add_argument("--posts", type=int, default=20, help="Drafts to post; half of them are posted twice to exercise the slug check.")
+    pipeline_parser.add_argument("--wp-latency", type=float, default=0.02)
+    pipeline_parser.add_argument("--wp-error-rate", type=float, default=0.1, help="Fraction of WordPress POSTs that answer 503.")
+    pipeline_parser.add_argument("--sequential", action="store_true", help="Also time scrape_google followed by a separate validation pass.")
+    pipeline_parser.add_argument("--save-baseline", metavar="FILE", help="Write the results to FILE for later --baseline runs.")
+    pipeline_parser.add_argument("--baseline", metavar="FILE", help="Compare against a saved baseline and exit 1 on regressions.")
+    pipeline_parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a metric counts as a regression.")
+    pipeline_parser.set_defaults(func=run_pipeline)
+
+    startup_parser = subparsers.add_parser("startup", help="Time `import app` in fresh interpreters and check it against a budget.")
+    startup_parser.add_argument("--runs", type=int, default=7)
+    startup_parser.add_argument("--budget-ms", type=float, help="Exit 1 if the median import time is over this many milliseconds.")
+    startup_parser.set_defaults(func=run_startup)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())